@@ -0,0 +1,158 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from stackrenderer import StackRenderer
+from interpolation import InterpolatedMatrix, interpolate_matrix
+from ranking import rank_frames
+from colourschedule import schedule_colours
+from instrument import step
+
+# Everything needed to draw any single frame of the animated plot, without depending on the frames before it.
+# animated_plot.py builds one of these, and so can anything else that wants to draw frames (e.g. worker processes drawing
+# different parts of the animation at the same time), so they all get exactly the same picture for the same frame.
+
+# Pixel to inch ratio
+px=1/96
+
+# These are the colours we will use for each name in the stackplot - I chose them at will
+# These names will be given and then recycled whenever a new name becomes top 10
+# I needed to have control over the colours to prevent the same colour from being given to adjacent stacks
+colours=["red","blue","green","yellow","purple","brown","cyan","pink","magenta",
+         "orange","tan","gold","lime","grey","violet","mediumspringgreen"]
+
+
+# The fewest years an animation can cover - anything shorter has no frames at all
+min_animation_years = 10
+
+
+# How many frames an animation of nyears years has - each frame shows the next 5 years, and this gives the 131 * 50 frames that
+# 1880-2019 has always had
+def frame_count(nyears, extent):
+    return max(nyears - (min_animation_years - 1), 0) * extent
+
+
+# Given a number (integer presumably), return it as a string + the corresponding suffix for the number
+# This is used for ranking the baby names in the plot animation
+def number_suffix(num):
+    strnum = str(num)
+
+    # These are the "odd suffixes out" - since they all have the same use cases I just put them in a list to avoid repeating code
+    one_two_three_suffixes = ["st","nd","rd"]
+
+    # It's based on the last and second-to-last digits
+    lastdigit = int( strnum[-1])
+    # 1,2,3 are the odd numbers out
+    if lastdigit in [1,2,3]:
+        # The exception is 11/12/13, which all end in "th", while all others end in the special suffixes
+        if len(strnum) >= 2 and strnum[-2] == "1":
+            return strnum + "th"
+        else:
+            # If not the exception, give the corresponding special suffix
+            return strnum + one_two_three_suffixes[lastdigit-1]
+
+    # Otherwise, if not ending in 1,2,3, it's always going to end in "th"
+    return strnum + "th"
+
+
+# Everything the renderer needs to draw one frame, in the order StackRenderer.update takes it (so renderer.update(*frame) works)
+# x is a view of the interpolated years rather than a copy, and values only has the N rows that are on screen
+class Frame:
+
+    __slots__ = ["x", "values", "colours", "labels", "title", "xlim", "xticks"]
+
+    def __init__(self, x, values, colours, labels, title, xlim, xticks):
+        self.x = x
+        self.values = values
+        self.colours = colours
+        self.labels = labels
+        self.title = title
+        self.xlim = xlim
+        self.xticks = xticks
+
+    def __iter__(self):
+        return iter((self.x, self.values, self.colours, self.labels, self.title, self.xlim, self.xticks))
+
+
+class FrameSource:
+
+    # interpolated - the InterpolatedMatrix of percentages, names - the name of each of its rows, years - the interpolated years
+    # rank_table - from ranking.rank_frames, colour_table - from colourschedule.schedule_colours, colours - the colours it indexes into
+    # extent - the interpolation extent, xintervalsize - how many interpolated columns each frame shows
+    def __init__(self, interpolated, names, years, rank_table, colour_table, colours, extent, xintervalsize, start, topN, gender):
+        self.interpolated = interpolated
+        self.names = names
+        self.years = years
+        self.rank_table = rank_table
+        self.colour_table = colour_table
+        self.colours = colours
+        self.extent = extent
+        self.xintervalsize = xintervalsize
+        self.start = start
+        self.topN = topN
+        self.gender = gender
+
+    def __len__(self):
+        return len(self.rank_table)
+
+    # The Frame for frame i: x values, one row of values per stack (in stacking order), colours and legend labels for each stack,
+    # the title, the x limits and the x ticks
+    def frame(self, i):
+
+        # Get the current year - the greater our interpolation, the more frames and the slower time will go
+        year = self.start + i/self.extent
+
+        with step("sort"):
+            # The names are stacked in the order they appear in the matrix, so stacks don't jump about when their ranking changes
+            order = self.rank_table.order[i]
+            place = self.rank_table.place[i]
+
+            # Only the columns this frame shows get interpolated, and only for the names on it
+            values = self.interpolated.window(i, self.xintervalsize, order)
+
+        with step("colour"):
+            colours = [self.colours[colour] for colour in self.colour_table[i][place]]
+
+        with step("labels"):
+            # Want to add the position of each name to make it clearer
+            labels = [ self.names[row] + " (" + number_suffix(1 + p) + ")" for row,p in zip(order, place) ]
+
+        # Don't want our x-axis to have decimal year values
+        the_current_year = int(year)
+        xticks = list(range(the_current_year, the_current_year+self.xintervalsize//self.extent))
+
+        # Define the bounds of the plot - this is made slightly more complicated by interpolation since it increases the density of the x-axis
+        xlim = (year,year+(self.xintervalsize-1*self.extent)/self.extent)
+
+        title = f"Top {self.topN} most popular US {self.gender} baby names in {the_current_year}"
+
+        return Frame(self.years[i:i+self.xintervalsize], values, colours, labels, title, xlim, xticks)
+
+    # Make a figure with everything that stays the same on every frame, and a renderer for the rest
+    def make_renderer(self):
+        fig, ax = plt.subplots(figsize=(1920*px,1080*px))
+
+        # Will go from 0 to 100 percent
+        ax.set_ylim(0,100)
+        ax.set_xlabel("Year",fontsize=15)
+        ax.set_ylabel(f"Percentage of top {self.topN} {self.gender} baby names",fontsize=15)
+
+        return StackRenderer(fig, ax, self.rank_table.top.shape[1])
+
+
+# Work out everything an animation of the matrix needs and put it in a FrameSource - if the rank/colour tables have already
+# been worked out (or partly worked out, see incremental.py) they can be passed in instead
+# colour_seed picks the colours (see colourschedule.py) - the same seed always gives the same video, None gives different colours every time
+def make_source(matrix, names, start, topN, extent, gender, rank_table=None, colour_table=None, colour_seed=0):
+
+    interpolated = InterpolatedMatrix(matrix, extent)
+    frames = frame_count(matrix.shape[1], extent)
+
+    if rank_table is None:
+        rank_table = rank_frames(interpolated, topN, frames)
+    if colour_table is None:
+        colour_table = schedule_colours(rank_table, len(colours), seed=colour_seed)
+
+    years = interpolate_matrix(np.arange(start, start + matrix.shape[1]), extent)
+
+    # I wanted to show the next 5 years since much shorter or longer would've have been relevant
+    return FrameSource(interpolated, names, years, rank_table, colour_table, colours,
+                       extent, 5*extent, start, topN, gender)
@@ -0,0 +1,168 @@
+import sys
+import json
+from collections import OrderedDict
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from namecache import load_table
+from namematrix import top_matrix
+from distribution import sparse_counts, cumulative_bands
+from animationframes import make_source, min_animation_years
+from totalplot import draw_total
+from videopipe import stream_video
+from stackrenderer import save_gif
+
+# This program makes lots of plots in one go from a single load of the data, instead of editing use_women/topN/etc and
+# running the other programs again and again. Each job says what to make:
+# { "style" : "alltime", "pretty" or "animated", "sex" : "F" or "M", "topN" : 10, "start" : 1880, "end" : 2019 }
+# and can also have "output" (the filename to save to), "all_names" (alltime/pretty only) and "interpolation_extent"/"video_format"/"colour_seed"
+# (animated only). start and end can be left out to use every year in the data folder, so a new yob file gets picked up without editing
+# (animated jobs need at least 10 years - every frame shows the next 5, so anything shorter has no frames)
+# The jobs can be given as a json file (a list of jobs) - python batch_render.py jobs.json - otherwise the ones below are made
+# Anything two jobs have in common (the data, the top N matrices, the rank and colour tables) is only worked out once
+
+# Pixel to inch ratio
+px=1/96
+
+jobs = [ { "style" : style, "sex" : sex, "topN" : 10 }
+         for style in ["alltime", "pretty", "animated"] for sex in ["F","M"] ]
+
+# Everything the jobs might share, worked out the first time a job needs it and then kept for the rest
+# A batch keeps everything, but something long-running (like render_server.py) can pass max_items to only keep that many of each kind,
+# throwing out whichever was used least recently
+class SharedData:
+
+    def __init__(self, folder="baby_Names", max_items=None):
+        # Both sexes come out of the same table, so the data only gets loaded once
+        self.table = load_table(folder)
+        self.max_items = max_items
+        self.matrices = OrderedDict()
+        self.counts = OrderedDict()
+        self.sources = OrderedDict()
+
+    # The value for key in memo, made with make() if it isn't there yet
+    def remember(self, memo, key, make):
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+
+        memo[key] = value = make()
+
+        if self.max_items is not None and len(memo) > self.max_items:
+            memo.popitem(last=False)
+
+        return value
+
+    def matrix(self, sex, topN, start, end):
+        return self.remember(self.matrices, (sex, topN, start, end), lambda : top_matrix(self.table, sex, topN, start, end))
+
+    def sparse(self, sex, start, end):
+        return self.remember(self.counts, (sex, start, end), lambda : sparse_counts(self.table, sex, start, end))
+
+    # The FrameSource for an animation
+    def source(self, sex, topN, start, end, extent, colour_seed=0):
+
+        def make():
+            matrix, names, _ = self.matrix(sex, topN, start, end)
+            return make_source(matrix, names, start, topN, extent, gender_of(sex), colour_seed=colour_seed)
+
+        return self.remember(self.sources, (sex, topN, start, end, extent, colour_seed), make)
+
+
+def gender_of(sex):
+    return "female" if sex == "F" else "male"
+
+
+# The file a job gets saved to if it doesn't say
+def default_output(job):
+    gender = gender_of(job["sex"])
+    suffix = f"{job['topN']}_{job['start']}_{job['end']}"
+
+    if job["style"] == "animated":
+        return f"{gender}babynames_{suffix}.{job.get('video_format', 'mp4')}"
+    if job["style"] == "pretty":
+        return f"baby{gender}_{suffix}.png"
+    return f"total{gender}_{suffix}.png"
+
+
+# Draw an alltime/pretty job on a new figure and return it
+def total_figure(shared, job):
+    sex = job["sex"]
+    topN, start, end = job["topN"], job["start"], job["end"]
+
+    fig, ax = plt.subplots(figsize=(1920*px,1080*px))
+    all_names = job.get("all_names", False)
+
+    if all_names:
+        threshold = job.get("min_band_pixels", 1) * 100 / ax.get_window_extent().height
+        values = cumulative_bands(shared.sparse(sex, start, end), threshold)
+    else:
+        values = shared.matrix(sex, topN, start, end)[0]
+
+    draw_total(ax, np.arange(start, end+1), values, gender_of(sex), banded=all_names)
+
+    return fig
+
+
+def render_job(shared, job):
+    style = job["style"]
+    sex = job["sex"]
+    topN, start, end = job["topN"], job["start"], job["end"]
+    output = job.get("output") or default_output(job)
+
+    if style == "animated":
+        extent = job.get("interpolation_extent", 50)
+        source = shared.source(sex, topN, start, end, extent, job.get("colour_seed", 0))
+        frames = len(source)
+
+        renderer = source.make_renderer()
+        draw = lambda i : renderer.update(*source.frame(i))
+
+        if output.endswith(".gif"):
+            save_gif(renderer, draw, frames, output, extent)
+        else:
+            stream_video(renderer, draw, range(frames), output, extent)
+
+        plt.close(renderer.fig)
+
+    elif style in ("alltime", "pretty"):
+        fig = total_figure(shared, job)
+        fig.savefig(output)
+        plt.close(fig)
+
+    else:
+        raise ValueError(f"Unknown style {style!r} - it should be alltime, pretty or animated")
+
+    return output
+
+
+# Raise ValueError saying what's wrong with a job that can't be made - all the jobs get checked before any of them are drawn,
+# so a mistake in the last one doesn't turn up after the others have taken hours
+def check_job(job):
+    if job["style"] not in ("alltime", "pretty", "animated"):
+        raise ValueError(f"Unknown style {job['style']!r} - it should be alltime, pretty or animated")
+    if job["start"] > job["end"]:
+        raise ValueError(f"The job {job} starts after it ends")
+    if job["style"] == "animated" and job["end"] - job["start"] + 1 < min_animation_years:
+        raise ValueError(f"The job {job} is too short to animate - animations need at least {min_animation_years} years")
+
+
+def render_all(jobs, folder="baby_Names"):
+    shared = SharedData(folder)
+    years = shared.table.years
+
+    jobs = [ { "start" : int(years[0]), "end" : int(years[-1]), **job } for job in jobs ]
+    for job in jobs:
+        check_job(job)
+
+    return [ render_job(shared, job) for job in jobs ]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            jobs = json.load(f)
+
+    for output in render_all(jobs):
+        print(output)
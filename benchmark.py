@@ -0,0 +1,233 @@
+import os
+import sys
+import time
+import json
+import shutil
+import platform
+import subprocess
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from namecache import load_table, available_years, parse_year, cache_folder_name, sex_codes
+from namematrix import top_matrix, head_matrix
+from interpolation import interpolate_matrix
+from ranking import rank_frames
+from colourschedule import schedule_colours
+from animationframes import make_source
+from distribution import sparse_counts, cumulative_bands
+from totalplot import draw_total
+
+# Times every stage of the programs separately, on the real data and on bigger made-up datasets, so we can tell whether a change
+# made things faster or slower and how each stage copes as the data grows.
+# python benchmark.py runs it on the real data and at 10x, python benchmark.py 1 10 100 at 100x too (that one's over 3GB of text).
+# Each scale s makes two datasets - one with s times as many names every year, and one with s times as many years - since
+# doing both at once would make 100x into 10000x.
+# The made-up yob files (and a copy of the real ones) go in benchmark_data/ and are only made once, the results go in
+# benchmark_results/ as json.
+
+source_folder = "baby_Names"
+synthetic_folder = "benchmark_data"
+results_folder = "benchmark_results"
+
+# Pixel to inch ratio
+px=1/96
+
+topN = 10
+interpolation_extent = 50
+
+# How many times to run the quick stages (the best and the median are both kept), and how many frames to time
+repeats = 3
+sample_frames = 50
+
+
+# Bump this whenever generate_dataset changes, so that made-up data from an older version isn't reused
+dataset_version = 2
+
+
+# Name suffixes for the made-up copies of a name - a, b, ..., z, aa, ab, ... so they still look like names
+def suffix(num):
+    letters = ""
+    num += 1
+    while num:
+        num, digit = divmod(num - 1, 26)
+        letters = chr(ord("a") + digit) + letters
+    return letters
+
+
+# Write made-up yob files to folder, in the same format as the real ones, with name_scale times as many names every year and
+# year_scale times as many years - the extra years repeat the real ones in order and the extra names are copies of the real ones
+# with a suffix and a random share of the original's count. Every sex block is still sorted from most to least popular, and still
+# has each name only once.
+def generate_dataset(folder, name_scale=1, year_scale=1, seed=0, source=source_folder):
+    rng = np.random.default_rng(seed)
+    real_years = available_years(source)
+    first = int(real_years[0])
+
+    os.makedirs(folder, exist_ok=True)
+    suffixes = np.array([""] + [suffix(j) for j in range(name_scale - 1)], dtype=object)
+
+    for ind in range(len(real_years) * year_scale):
+        real = parse_year(source, int(real_years[ind % len(real_years)]))
+        blocks = []
+
+        for sex in sex_codes:
+            block = real[real["sex"] == sex]
+
+            names = np.add.outer(block["name"].to_numpy(dtype=object), suffixes).ravel()
+            counts = np.repeat(block["quantity"].to_numpy(dtype=np.float64), name_scale)
+
+            # The copies get between half and all of the original's count, but never fewer than 5 like the real files
+            copies = np.tile(np.arange(name_scale) > 0, len(block))
+            counts[copies] *= rng.uniform(0.5, 1.0, copies.sum())
+            counts = np.maximum(counts.astype(np.int64), 5)
+
+            # A copy can come out as another real name (Jo + y is Joy) or the same as another copy (Jo + ya and Joy + a), so only
+            # the first of each name is kept - with the real names looked at first so they always stay
+            real_first = np.argsort(copies, kind="stable")
+            keep = real_first[~pd.Index(names[real_first]).duplicated()]
+            names, counts = names[keep], counts[keep]
+
+            order = np.argsort(-counts, kind="stable")
+            blocks.append(pd.DataFrame({ "name" : names[order], "sex" : sex, "quantity" : counts[order] }))
+
+        pd.concat(blocks).to_csv(os.path.join(folder, f"yob{first + ind}.txt"), header=False, index=False)
+
+
+# Run stage() repeat times and return how long each run took
+def time_stage(stage, repeat=1):
+    seconds = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        stage()
+        seconds.append(time.perf_counter() - begin)
+    return seconds
+
+
+def summary(seconds, per=1):
+    seconds = [s / per for s in seconds]
+    return { "seconds" : seconds, "best" : min(seconds), "median" : float(np.median(seconds)) }
+
+
+# Time every stage on the yob files in folder - returns { stage : { "seconds", "best", "median" } } plus some facts about the data
+def benchmark_folder(folder, sex="F"):
+    stages = {}
+    years = available_years(folder)
+    start, end = int(years[0]), int(years[-1])
+
+    # The loop all 3 programs used to start with - every csv parsed with pandas
+    stages["csv_load"] = summary(time_stage(lambda : [parse_year(folder, int(year)) for year in years]))
+
+    # Building the cache from nothing, then opening it again once it's there
+    shutil.rmtree(os.path.join(folder, cache_folder_name), ignore_errors=True)
+    stages["cache_build"] = summary(time_stage(lambda : load_table(folder)))
+    stages["cache_load"] = summary(time_stage(lambda : load_table(folder), repeats))
+    table = load_table(folder)
+
+    # What used to be the gender_dict loop, from the cache and from the head reader
+    stages["aggregation"] = summary(time_stage(lambda : top_matrix(table, sex, topN, start, end), repeats))
+    head_matrix(sex, topN, start, end, folder)
+    stages["head_aggregation"] = summary(time_stage(lambda : head_matrix(sex, topN, start, end, folder), repeats))
+    matrix, names, _ = top_matrix(table, sex, topN, start, end)
+
+    # What used to be interpolate_list, done for the whole matrix at once
+    stages["interpolation"] = summary(time_stage(lambda : interpolate_matrix(matrix, interpolation_extent), repeats))
+
+    source = make_source(matrix, names, start, topN, interpolation_extent, "female" if sex == "F" else "male")
+    frames = len(source)
+
+    stages["rank_table"] = summary(time_stage(lambda : rank_frames(source.interpolated, topN, frames)))
+    stages["colour_schedule"] = summary(time_stage(lambda : schedule_colours(source.rank_table, len(source.colours), seed=0)))
+
+    # What animate costs per frame - the frames are spread out over the whole animation
+    renderer = source.make_renderer()
+    renderer.update(*source.frame(0))
+    renderer.draw_background()
+    chosen = np.linspace(0, frames - 1, min(sample_frames, frames)).astype(int)
+
+    def draw_frames():
+        for i in chosen:
+            renderer.update(*source.frame(i))
+            renderer.blit()
+
+    stages["frame"] = summary(time_stage(draw_frames, repeats), per=len(chosen))
+    plt.close(renderer.fig)
+
+    # The whole stackplot alltime_plot and prettyplot draw, and the all-names version
+    def render_total(values, banded):
+        fig, ax = plt.subplots(figsize=(1920*px,1080*px))
+        draw_total(ax, np.arange(start, end+1), values, "female", banded=banded)
+        fig.canvas.draw()
+        plt.close(fig)
+
+    stages["stackplot_render"] = summary(time_stage(lambda : render_total(matrix, False), repeats))
+
+    # 1080px figures have axes about 831px tall, so this is the same 1 pixel threshold alltime_plot uses
+    bands = cumulative_bands(sparse_counts(table, sex, start, end), 100 / 831)
+    stages["banded_render"] = summary(time_stage(lambda : render_total(bands, True), repeats))
+
+    return { "rows" : len(table), "years" : len(years), "names" : len(table.names), "frames" : frames, "stages" : stages }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales):
+    results = { "commit" : git_commit(),
+                "time" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python" : platform.python_version(),
+                "numpy" : np.__version__,
+                "pandas" : pd.__version__,
+                "matplotlib" : matplotlib.__version__,
+                "machine" : platform.platform(),
+                "datasets" : {} }
+
+    for scale in scales:
+        if scale == 1:
+            # A copy of the real data, so that timing the cache build doesn't throw away the real cache
+            folder = os.path.join(synthetic_folder, "real")
+
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+                for year in available_years(source_folder):
+                    shutil.copy2(os.path.join(source_folder, f"yob{year}.txt"), folder)
+
+            datasets = { "real" : folder }
+        else:
+            datasets = {}
+            for kind, name_scale, year_scale in [("names", scale, 1), ("years", 1, scale)]:
+                folder = os.path.join(synthetic_folder, f"{kind}{scale}_v{dataset_version}")
+
+                if not os.path.isdir(folder):
+                    print(f"Making {folder}...")
+                    generate_dataset(folder, name_scale, year_scale)
+
+                datasets[f"{kind}{scale}"] = folder
+
+        for label, folder in datasets.items():
+            print(f"Benchmarking {label}...")
+            results["datasets"][label] = { "name_scale" : scale if label.startswith("names") else 1,
+                                           "year_scale" : scale if label.startswith("years") else 1,
+                                           **benchmark_folder(folder) }
+
+    return results
+
+
+if __name__ == "__main__":
+    scales = [int(arg) for arg in sys.argv[1:]] or [1, 10]
+    results = run_benchmarks(scales)
+
+    os.makedirs(results_folder, exist_ok=True)
+    filename = os.path.join(results_folder, f"{results['time'].replace(':', '')}_{(results['commit'] or 'nocommit')[:8]}.json")
+
+    with open(filename, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for label, dataset in results["datasets"].items():
+        print(label, { stage : round(timing["best"], 4) for stage, timing in dataset["stages"].items() })
+    print(f"Saved to {filename}")
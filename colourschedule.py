@@ -0,0 +1,62 @@
+import random
+import numpy as np
+
+# Works out the colour of every name on every frame of the animation before anything is drawn.
+# animate used to carry the colours over from one frame to the next through a global list, which meant frames could only ever be drawn
+# in order, one after another. Replaying the same rules over the rank table up front gives a table we can look any frame up in.
+
+
+# The rules are the same as they always were:
+# -Names in the first frame get the colours in order, from most to least popular
+# -A name that stays in the top N keeps its colour
+# -A name that drops out gives its colour back, and a name that comes in gets a random colour that nobody in the top N is using
+# So every time a name comes into the top N it gets a colour for as long as it stays there, and no two names on screen ever share one
+# Returns a frames x N array of indices into the colours list, lined up with rank_table.top (so [i][k] is the colour of the k+1th name on frame i)
+# sample is the function used to shuffle the colours - random.sample, like animate always used
+# With a seed, each frame shuffles with its own random.Random seeded from the seed and the frame number instead, so the same seed
+# always gives the same table - and working out only the frames from `first` onwards gives the same table as working out all of them
+# If only the frames from `first` onwards have changed, pass the old colour table as previous_table and the earlier frames keep their colours
+def schedule_colours(rank_table, ncolours, sample=random.sample, previous_table=None, first=0, seed=None):
+
+    frames, N = rank_table.top.shape
+    colour_table = np.empty((frames, N), dtype=np.min_scalar_type(max(ncolours - 1, 0)))
+
+    if frames == 0:
+        return colour_table
+
+    if previous_table is None or previous_table.shape[1] != N:
+        first = 1
+        colour_table[0] = np.arange(N)
+    else:
+        first = max(1, min(first, len(previous_table), frames))
+        colour_table[:first] = previous_table[:first]
+
+    # Name (well, row of the matrix) -> colour for everyone in the top N on the previous frame
+    previous = dict(zip(rank_table.top[first-1].tolist(), colour_table[first-1].tolist()))
+
+    for i in range(first, frames):
+        nextrows = rank_table.top[i].tolist()
+
+        # If the top N is exactly the same people as last frame then everyone just keeps their colour
+        current = { row : previous[row] for row in nextrows if row in previous }
+
+        if len(current) < N:
+            # Colours of everyone who is still in, which the newcomers can't have
+            colourslist = list(current.values())
+
+            if seed is not None:
+                sample = random.Random(f"{seed}:{i}").sample
+
+            for row in nextrows:
+                if row not in current:
+                    # Shuffle first using sample so that we can get a variety of different colours, then take the first free one
+                    for colour in sample(range(ncolours), ncolours):
+                        if colour not in colourslist:
+                            current[row] = colour
+                            colourslist.append(colour)
+                            break
+
+        colour_table[i] = [current[row] for row in nextrows]
+        previous = current
+
+    return colour_table
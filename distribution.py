@@ -0,0 +1,109 @@
+import numpy as np
+from matplotlib.collections import PolyCollection
+from namecache import sex_codes
+
+# The "all names" version of alltime_plot - every name of one sex in every year, not just the top 10.
+# That's around 100,000 names, far too many to give each one its own stack, and most of them would be much thinner than a pixel anyway.
+# So the counts are kept sparse (only the names each year actually has), and neighbouring names that are too thin to see on their own
+# are merged into bands at least a pixel high. The bands are drawn as a single rasterised collection of polygons.
+
+
+# The counts of every name of one sex from start to end, stored sparsely - one entry per (name, year) that actually has babies
+# rows/columns/counts are the entries, sorted by year and then by row. The rows go in the order the names first appeared (then by rank),
+# the same order namematrix uses, so they stack the same way
+# There are about a million entries for each sex, so they're kept in the smallest types that fit - uint32 rows and counts and
+# uint16 columns, 10 bytes an entry instead of 24
+class SparseCounts:
+
+    def __init__(self, rows, columns, counts, names, years):
+        self.rows = rows
+        self.columns = columns
+        self.counts = counts
+        self.names = names
+        self.years = years
+
+    # Total babies of this sex each year
+    def totals(self):
+        return np.bincount(self.columns, weights=self.counts, minlength=len(self.years))
+
+    # Each entry as a percentage of its year's total - float32 is far more precise than a pixel of the plot needs
+    def shares(self):
+        return (self.counts * 100 / self.totals()[self.columns]).astype(np.float32)
+
+
+def sparse_counts(table, sex, start, end):
+
+    year_column = np.asarray(table.year)
+    selected = np.flatnonzero( (year_column >= start) & (year_column <= end) & (np.asarray(table.sex) == sex_codes[sex]) )
+
+    # The table is already in year order and then most to least popular, so the first time we see a name is its first appearance
+    ids = np.asarray(table.name)[selected]
+    unique_ids, first_seen, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    appearance_order = np.argsort(first_seen, kind="stable")
+    row_of_unique = np.empty(len(unique_ids), dtype=np.intp)
+    row_of_unique[appearance_order] = np.arange(len(unique_ids))
+
+    rows = row_of_unique[inverse].astype(np.uint32)
+    columns = (year_column[selected] - start).astype(np.uint16)
+    counts = np.asarray(table.count)[selected]
+
+    # Sort by year then row so each year's stack is in order
+    order = np.lexsort((rows, columns))
+
+    return SparseCounts(rows[order], columns[order], counts[order],
+                        table.names[unique_ids[appearance_order]], np.arange(start, end+1))
+
+
+# Merge names into bands that are at least `threshold` percent high somewhere, keeping the stacking order
+# Any name that gets that high by itself keeps a band of its own, and runs of thinner names are grouped together until the
+# biggest each of them gets adds up to the threshold. Returns the band of each row
+def band_rows(peaks, threshold):
+
+    big = peaks >= threshold
+
+    # Running total of the thin names' peaks, which starts again after every big name
+    thin_peaks = np.where(big, 0, peaks)
+    running = np.cumsum(thin_peaks)
+    run_start = np.maximum.accumulate(np.where(big, running, 0))
+    level = np.floor((running - run_start) / threshold)
+
+    # A new band starts at every big name, after every big name, and whenever the running total goes past another threshold
+    starts = np.ones(len(peaks), dtype=bool)
+    starts[1:] = big[1:] | big[:-1] | (level[1:] != level[:-1])
+
+    return np.cumsum(starts) - 1
+
+
+# Bands of the whole distribution ready for drawing - tops[b] is the top of band b in every year (so band b goes from tops[b-1]
+# up to tops[b], and band 0 from 0). These are the cumulative sums of the shares in stacking order, only kept at the band edges
+def cumulative_bands(counts, threshold):
+
+    shares = counts.shares()
+    nrows = len(counts.names)
+    nyears = len(counts.years)
+
+    # The biggest share each name ever gets
+    peaks = np.zeros(nrows, dtype=np.float32)
+    np.maximum.at(peaks, counts.rows, shares)
+
+    bands = band_rows(peaks, threshold)
+    nbands = bands[-1] + 1 if nrows else 0
+
+    # Add the shares up into their bands, then the running total up the stack gives the band edges
+    heights = np.bincount(bands[counts.rows] * nyears + counts.columns, weights=shares, minlength=nbands * nyears)
+    tops = np.cumsum(heights.reshape(nbands, nyears), axis=0)
+
+    return tops
+
+
+# One polygon per band, going along the top of the band and back along its bottom, all in one rasterised collection
+def band_collection(years, tops, colours):
+
+    bottoms = np.vstack([np.zeros((1, len(years))), tops[:-1]])
+
+    x = np.concatenate([years, years[::-1]]).astype(np.float64)
+    y = np.concatenate([tops, bottoms[:, ::-1]], axis=1)
+
+    verts = np.stack([np.broadcast_to(x, y.shape), y], axis=-1)
+
+    return PolyCollection(verts, facecolors=colours, edgecolors="face", linewidths=0, rasterized=True)
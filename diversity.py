@@ -0,0 +1,171 @@
+import sys
+import multiprocessing
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from namecache import load_table, data_folder, sex_letters
+
+# Measures how diverse the names given each year are, using every name in the data rather than just the top 10 - the numbers behind
+# "female names change much more often than male ones". For every year and sex:
+# entropy       - Shannon entropy of the names in bits (higher = more spread out over more names)
+# herfindahl    - the chance two babies picked at random have the same name (sum of the squared shares)
+# top_share     - the percentage of babies given one of the top N names
+# half_names    - how many of the most popular names it takes to cover half of the babies
+# turnover      - the percentage of babies that would need a different name to match last year's distribution (total variation distance)
+# top_turnover  - how many of this year's top N weren't in last year's top N
+# along with births and names (how many babies and how many different names)
+# Everything is worked out for all ~2 million rows in one go with numpy, no loops over years or names.
+# python diversity.py entropy plots one of them for both sexes, like alltime_plot.py does
+
+# Pixel to inch ratio
+px=1/96
+
+metric_labels = { "entropy" : "Shannon entropy of names (bits)",
+                  "herfindahl" : "Herfindahl index (chance two babies share a name)",
+                  "top_share" : "Percentage of babies given a top {topN} name",
+                  "half_names" : "Names needed to cover half of all babies",
+                  "turnover" : "Year-over-year turnover (% of babies)",
+                  "top_turnover" : "Names new to the top {topN} since last year" }
+
+sex_colours = { "F" : "red", "M" : "blue" }
+
+# Set by init_worker in each worker process
+worker_table = None
+
+
+def init_worker(table):
+    global worker_table
+    worker_table = table
+
+
+# The metrics for every year from start to end (inclusive) in the table, as a DataFrame with a row per (year, sex)
+def diversity_metrics(table, start=None, end=None, topN=10):
+    years = table.years
+    start = int(years[0]) if start is None else start
+    end = int(years[-1]) if end is None else end
+
+    # The year before start is needed for the turnover, but doesn't get a row of its own
+    first = max(start - 1, int(years[0]))
+    rows = [table.year_rows[year] for year in range(first, end + 1) if year in table.year_rows]
+    lo, hi = (rows[0][0], rows[-1][1]) if rows else (0, 0)
+
+    year = np.asarray(table.year[lo:hi]).astype(np.intp) - first
+    sex = np.asarray(table.sex[lo:hi]).astype(np.intp)
+    name = np.asarray(table.name[lo:hi]).astype(np.intp)
+    count = np.asarray(table.count[lo:hi]).astype(np.float64)
+
+    nyears = end - first + 1
+    nblocks = nyears * 2
+
+    # Every (year, sex) is one block of rows, and the table has them in order with each one sorted from most to least popular
+    blocks = year * 2 + sex
+    sizes = np.bincount(blocks, minlength=nblocks)
+    starts = np.cumsum(sizes) - sizes
+    births = np.bincount(blocks, weights=count, minlength=nblocks)
+
+    rank = np.arange(len(blocks)) - starts[blocks]
+    share = count / births[blocks]
+
+    # Shannon entropy and Herfindahl index are both just sums over each block
+    entropy = np.bincount(blocks, weights=-share * np.log2(share), minlength=nblocks)
+    herfindahl = np.bincount(blocks, weights=share * share, minlength=nblocks)
+
+    top_share = np.bincount(blocks, weights=np.where(rank < topN, share, 0), minlength=nblocks) * 100
+
+    # The running total of births within each block - a name is needed for half coverage if the names before it don't get there yet
+    running = np.cumsum(count) - count
+    before = running - running[starts[blocks]]
+    half_names = np.bincount(blocks, weights=before < births[blocks] / 2, minlength=nblocks)
+
+    # Turnover needs the same name in consecutive years - grouping the rows by (sex, name) keeps them in year order within each group
+    order = np.argsort(sex * (name.max() + 1 if len(name) else 1) + name, kind="stable")
+    same = (sex[order][1:] == sex[order][:-1]) & (name[order][1:] == name[order][:-1]) & (year[order][1:] == year[order][:-1] + 1)
+
+    this, last = order[1:][same], order[:-1][same]
+
+    # The share of babies that didn't change is the overlap of the two years' distributions
+    kept = np.bincount(blocks[this], weights=np.minimum(share[this], share[last]), minlength=nblocks)
+    turnover = (1 - kept) * 100
+
+    both_top = (rank[this] < topN) & (rank[last] < topN)
+    top_turnover = np.minimum(sizes, topN) - np.bincount(blocks[this][both_top], minlength=nblocks)
+
+    # The first year (or one after a missing year) has no year before it to compare with
+    no_last_year = np.concatenate([[True, True], sizes[:-2] == 0])
+    turnover[no_last_year] = np.nan
+    top_turnover = np.where(no_last_year, np.nan, top_turnover)
+
+    metrics = pd.DataFrame({ "year" : np.repeat(np.arange(first, end + 1), 2),
+                             "sex" : np.tile(sex_letters, nyears),
+                             "births" : births.astype(np.int64),
+                             "names" : sizes,
+                             "entropy" : entropy,
+                             "herfindahl" : herfindahl,
+                             "top_share" : top_share,
+                             "half_names" : half_names.astype(np.int64),
+                             "turnover" : turnover,
+                             "top_turnover" : top_turnover })
+
+    # Drop the extra year before start, and any years that aren't in the data
+    metrics = metrics[(metrics["year"] >= start) & (metrics["names"] > 0)]
+    return metrics.reset_index(drop=True)
+
+
+def decade_metrics(task):
+    start, end, topN = task
+    return diversity_metrics(worker_table, start, end, topN)
+
+
+# The same as diversity_metrics over the whole table, but with each decade worked out on its own process
+def sharded_metrics(table, topN=10, processes=None):
+    years = table.years
+    first, last = int(years[0]), int(years[-1])
+
+    decades = [ (start, min(start + 9, last), topN) for start in range(first - first % 10, last + 1, 10) ]
+    decades[0] = (first, decades[0][1], topN)
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    with context.Pool(processes, initializer=init_worker, initargs=(table,)) as pool:
+        pieces = pool.map(decade_metrics, decades)
+
+    # Each decade looked back at the year before it for the turnover, so the pieces fit together exactly
+    return pd.concat(pieces, ignore_index=True)
+
+
+def load_metrics(topN=10, folder=data_folder, processes=1):
+    table = load_table(folder)
+
+    if processes > 1:
+        return sharded_metrics(table, topN, processes)
+    return diversity_metrics(table, topN=topN)
+
+
+# Plot one of the metrics over the years for both sexes
+def draw_metric(ax, metrics, metric, topN=10):
+    years = metrics["year"]
+    ax.set_xlim(years.min(), years.max())
+
+    for sex, gender in (("F", "female"), ("M", "male")):
+        rows = metrics[metrics["sex"] == sex]
+        ax.plot(rows["year"], rows[metric], color=sex_colours[sex], label=gender, linewidth=2)
+
+    ax.set_xlabel("Year", fontsize=15)
+    ax.set_ylabel(metric_labels[metric].format(topN=topN), fontsize=15)
+    ax.set_title(f"Diversity of US baby names - {metric_labels[metric].format(topN=topN).lower()}", fontsize=22)
+    ax.legend(loc="upper left")
+
+
+if __name__ == "__main__":
+    metric = sys.argv[1] if len(sys.argv) > 1 else "entropy"
+
+    if metric not in metric_labels:
+        raise SystemExit(f"Unknown metric {metric!r} - it should be one of {', '.join(metric_labels)}")
+
+    metrics = load_metrics()
+
+    fig, ax = plt.subplots(figsize=(1920*px,1080*px))
+    draw_metric(ax, metrics, metric)
+
+    plt.show()
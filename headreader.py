@@ -0,0 +1,101 @@
+import os
+import json
+from namecache import data_folder, cache_folder_name, scan_folder
+
+# Reads just the first N rows of each sex from a yob file, for when only the top N names are wanted.
+# Every yob file has all the F rows first and then all the M rows, each sorted from most to least popular, so the top N of a sex
+# is always the first N rows of its block. Reading stops as soon as it has N rows, and the M block is jumped to directly using
+# an index of the byte where it starts in each file - so a top 10 load reads a few kilobytes per file instead of the whole thing.
+# The index is kept in the cache folder and only worked out again for files whose size or modification time has changed.
+
+index_version = 1
+
+
+def index_path(folder):
+    return os.path.join(folder, cache_folder_name, "offsets.json")
+
+
+# The byte at which the M block starts (the size of the file if there are no M rows)
+def find_m_block(path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    # The first line with M as its sex - names never contain commas, so ",M," can only be the sex column
+    pos = data.find(b",M,")
+    if pos == -1:
+        return len(data)
+
+    return data.rfind(b"\n", 0, pos) + 1
+
+
+# { year : [size, mtime_ns, byte where the M block starts, size of the file] } for every yob file, worked out again only where needed
+def load_offsets(folder=data_folder):
+    path = index_path(folder)
+
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        stored = {}
+
+    if stored.get("version") != index_version:
+        stored = {}
+
+    old = stored.get("years", {})
+    on_disk = scan_folder(folder)
+    offsets = {}
+
+    for year, stat in on_disk.items():
+        cached = old.get(str(year))
+
+        if cached is not None and cached["stat"] == stat:
+            offsets[year] = cached["m_offset"]
+        else:
+            offsets[year] = find_m_block(os.path.join(folder, f"yob{year}.txt"))
+
+    # Only write the index back if something in it has changed
+    if len(old) != len(on_disk) or any(old.get(str(year), {}).get("stat") != on_disk[year] for year in on_disk):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(path + ".tmp", "w") as f:
+            json.dump({ "version" : index_version,
+                        "years" : { str(year) : { "stat" : on_disk[year], "m_offset" : offsets[year] } for year in on_disk } }, f)
+        os.replace(path + ".tmp", path)
+
+    return offsets
+
+
+# The first topN rows of one sex in one year, as a list of (name, quantity), from most to least popular
+# m_offset is where the M block starts, from load_offsets
+def read_head(folder, year, sex, topN, m_offset):
+    rows = []
+
+    if topN <= 0:
+        return rows
+
+    with open(os.path.join(folder, f"yob{year}.txt"), "rb") as f:
+        if sex == "M":
+            f.seek(m_offset)
+            stop = None
+        else:
+            stop = m_offset
+
+        read = f.tell()
+
+        for line in f:
+            # Don't run over into the M block when reading the F one
+            if stop is not None and read >= stop:
+                break
+            read += len(line)
+
+            line = line.strip()
+            if not line:
+                continue
+
+            name, _, quantity = line.decode().split(",")
+            rows.append((name, int(quantity)))
+
+            if len(rows) == topN:
+                break
+
+    return rows
@@ -0,0 +1,178 @@
+import os
+import sys
+import numpy as np
+from namecache import load_table, scan_folder, data_folder, cache_folder_name
+from namematrix import top_matrix
+from interpolation import InterpolatedMatrix
+from ranking import RankTable, rank_frames
+from colourschedule import schedule_colours
+from animationframes import make_source, frame_count, colours
+from parallelexport import segment_frames, fixed_chunks, segment_name, render_segments, concat_videos
+
+# Keeps an animation up to date when a new yob file is added (or one gets corrected), without redoing the whole thing.
+# The matrix, rank table and colour table of the last render are kept in the cache folder along with the size/mtime of the yob files
+# they came from, and the video itself is kept as a folder of segments (<output>_incremental_...). When the yob files change:
+# -Only the years from the first new/changed one onwards are aggregated again, and their columns replace the old ones
+# -Only the frames that can see those years get their ranks and colours worked out again
+# -Only the segments containing frames whose 5-year window includes the new data get drawn again, and then they're all joined up
+# Run it with python incremental.py (or python incremental.py F to just do one sex)
+
+state_version = 2
+
+
+def state_path(folder, sex, topN, extent):
+    return os.path.join(folder, cache_folder_name, f"animation_{sex}{topN}_{extent}.npz")
+
+
+# The stored aggregates, or None if there aren't any we can use
+def load_state(path):
+    try:
+        with np.load(path) as stored:
+            state = { key : stored[key] for key in stored.files }
+    except (OSError, ValueError):
+        return None
+
+    if int(state.get("version", -1)) != state_version:
+        return None
+
+    state["names"] = [str(name) for name in state["names"]]
+    return state
+
+
+def save_state(path, state):
+    # np.savez adds .npz itself if the name doesn't already end with it
+    np.savez(path + ".tmp.npz", version=state_version, **state)
+    os.replace(path + ".tmp.npz", path)
+
+
+# The index of the first year that isn't the same as when the state was saved (a new year, a changed file or a missing one)
+# or None if nothing has changed
+def first_changed_year(state, years, stats):
+    old_years = state["years"].tolist()
+    old_stats = state["stats"].tolist()
+
+    for ind, year in enumerate(years):
+        if ind >= len(old_years) or old_years[ind] != year or old_stats[ind] != stats[year]:
+            return ind
+
+    # A year that has been taken off the end
+    if len(old_years) > len(years):
+        return len(years)
+
+    return None
+
+
+# Bring the stored matrix up to date, recomputing only the years from index `changed` onwards
+# Names are ordered by when they first made the top N, so the names that first appeared before that year are all at the start
+# and stay exactly where they are - anyone new goes on the end, which is where a full recompute would put them too
+def update_matrix(table, state, sex, topN, start, end, changed):
+
+    if state is None or changed == 0:
+        matrix, names, _ = top_matrix(table, sex, topN, start, end)
+        return matrix, names
+
+    kept_rows = int(np.count_nonzero(state["matrix"][:, :changed].any(axis=1)))
+    names = state["names"][:kept_rows]
+    name_index = { name : row for row,name in enumerate(names) }
+
+    new_columns, new_names, _ = top_matrix(table, sex, topN, start + changed, end)
+
+    for name in new_names:
+        if name not in name_index:
+            name_index[name] = len(names)
+            names.append(name)
+
+    matrix = np.zeros((len(names), end - start + 1))
+    matrix[:kept_rows, :changed] = state["matrix"][:kept_rows, :changed]
+    matrix[[name_index[name] for name in new_names], changed:] = new_columns
+
+    return matrix, names
+
+
+# Update the stored aggregates and the video for one sex, re-rendering only what the changed years affect
+def refresh_animation(sex, topN=10, extent=50, folder=data_folder, output=None, processes=1, colour_seed=0):
+
+    gender = "female" if sex == "F" else "male"
+    output = output or f"{gender}babynames.mp4"
+    base, extension = os.path.splitext(output)
+    # Not the same folder resumable.py uses, since it keeps track of which segments are finished in its own way - and one for each
+    # stored state, so segments drawn for a different topN or extent are never taken for up to date ones
+    segment_folder = f"{base}_incremental_{sex}{topN}_{extent}"
+
+    # Loading the table also brings the cache up to date, so it only parses the yob files that changed
+    table = load_table(folder)
+    stats = scan_folder(folder)
+    years = sorted(stats)
+    start, end = years[0], years[-1]
+
+    path = state_path(folder, sex, topN, extent)
+    state = load_state(path)
+
+    # If the years don't start in the same place anymore then everything moves, so start again - and the same if the colours
+    # were picked with a different seed, since then every frame could look different
+    if state is not None and (int(state["years"][0]) != start or int(state["colour_seed"]) != colour_seed):
+        state = None
+
+    changed = 0 if state is None else first_changed_year(state, years, stats)
+    frames = frame_count(end - start + 1, extent)
+    xintervalsize = 5*extent
+
+    if changed is None:
+        # The aggregates are already up to date - just make sure none of the segments have gone missing
+        first_frame = frames
+        matrix, names = state["matrix"], state["names"]
+        rank_table = RankTable(state["top"], state["order"], state["place"])
+        colour_table = state["colour_table"]
+    else:
+        matrix, names = update_matrix(table, state, sex, topN, start, end, changed)
+
+        # Interpolated column (changed-1) * extent is still exactly the last unchanged year, everything after it is new
+        first_column = max((changed - 1) * extent + 1, 0) if changed else 0
+
+        if state is None:
+            previous_ranks = previous_colours = None
+        else:
+            previous_ranks = RankTable(state["top"], state["order"], state["place"])
+            previous_colours = state["colour_table"]
+
+        rank_table = rank_frames(InterpolatedMatrix(matrix, extent), topN, frames, previous=previous_ranks, first=first_column)
+        colour_table = schedule_colours(rank_table, len(colours), previous_table=previous_colours, first=first_column, seed=colour_seed)
+
+        # A frame shows xintervalsize columns from its own, so it can see the new data a little before its own column gets there
+        # (and any frames there weren't before are new too)
+        first_frame = max(first_column - xintervalsize + 1, 0) if changed else 0
+        if previous_ranks is not None:
+            first_frame = min(first_frame, len(previous_ranks))
+
+    source = make_source(matrix, names, start, topN, extent, gender, rank_table, colour_table)
+
+    os.makedirs(segment_folder, exist_ok=True)
+    segments = fixed_chunks(frames, segment_frames)
+    filenames = [ segment_name(segment_folder, first, last, extension) for first,last in segments ]
+
+    # Anything left over from before that isn't one of the current segments (e.g. what used to be the last, shorter segment)
+    for leftover in set(os.listdir(segment_folder)) - { os.path.basename(filename) for filename in filenames }:
+        os.remove(os.path.join(segment_folder, leftover))
+
+    # Draw the segments with any frames that have changed, and any that are missing
+    todo = [ (first, last) for (first, last), filename in zip(segments, filenames)
+             if last > first_frame or not os.path.exists(filename) ]
+
+    render_segments(source, todo, segment_folder, extent, extension, processes)
+    concat_videos(filenames, output)
+
+    # The state is only saved once every segment it affects has been drawn again - if this run gets killed partway through,
+    # the next one still sees the old state and redraws the same segments instead of thinking they're up to date
+    if changed is not None:
+        save_state(path, { "matrix" : matrix, "names" : np.array(names, dtype=str), "years" : np.array(years),
+                           "stats" : np.array([stats[year] for year in years]),
+                           "top" : rank_table.top, "order" : rank_table.order, "place" : rank_table.place,
+                           "colour_table" : colour_table, "colour_seed" : colour_seed })
+
+    return todo
+
+
+if __name__ == "__main__":
+    for sex in (sys.argv[1:] or ["F","M"]):
+        redrawn = refresh_animation(sex)
+        print(f"{sex}: redrew {sum(last - first for first,last in redrawn)} frames")
@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import atexit
+import contextlib
+import numpy as np
+
+# Optional timing of everything the programs do, for finding out where a long render actually spends its time.
+# It's off unless the BABYNAMES_TRACE environment variable is set to a filename, e.g.
+#   BABYNAMES_TRACE=trace.json python animated_plot.py
+# and then when the program finishes it writes a trace that chrome://tracing or https://ui.perfetto.dev can open, with:
+# -Every stage (loading, aggregating, interpolating, ranking, drawing...) with how long it took and the most memory (RSS) it used
+# -Every frame of an animation, split into the steps of drawing it (sort, colour, draw, encode)
+# -A histogram of how long each step took over all the frames, and the slowest frames, under "otherData"
+# When it's off, stage/frame/step hand back a context manager that does nothing, so leaving them in costs next to nothing.
+
+trace_file = os.environ.get("BABYNAMES_TRACE")
+
+# How many of the slowest frames to list for each step
+slowest_count = 10
+
+disabled = contextlib.nullcontext()
+
+
+def now():
+    return time.perf_counter_ns() // 1000
+
+
+# The process's memory use in bytes - (current, peak since the peak was last reset)
+# Linux keeps both in /proc, elsewhere the peak is the peak for the whole run and there's no current figure
+# (and on Windows, which has neither, both are 0)
+def memory_use():
+    try:
+        with open("/proc/self/status") as f:
+            fields = dict(line.split(":", 1) for line in f)
+        return int(fields["VmRSS"].split()[0]) * 1024, int(fields["VmHWM"].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0, 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return peak, peak
+
+
+# Start measuring the peak from now on (Linux only - writing 5 to clear_refs resets VmHWM)
+def reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+class Stage:
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        tracer = self.tracer
+
+        # There's only one peak, so the stage we're inside of takes whatever the peak has been so far before it's reset
+        if tracer.stack:
+            tracer.stack[-1].peak = max(tracer.stack[-1].peak, memory_use()[1])
+
+        reset_peak()
+        self.memory, self.peak = memory_use()
+        tracer.stack.append(self)
+
+        self.start = now()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = now()
+        tracer = self.tracer
+        tracer.stack.pop()
+
+        current, peak = memory_use()
+        self.peak = max(self.peak, peak)
+
+        if tracer.stack:
+            tracer.stack[-1].peak = max(tracer.stack[-1].peak, self.peak)
+
+        args = dict(self.args)
+        args["peak_memory_mb"] = round(self.peak / 2**20, 1)
+        args["peak_increase_mb"] = round((self.peak - self.memory) / 2**20, 1)
+        args["memory_change_mb"] = round((current - self.memory) / 2**20, 1)
+
+        tracer.complete(self.name, "stage", self.start, end, args)
+        tracer.events.append({ "name" : "memory", "ph" : "C", "ts" : end, "pid" : tracer.pid, "tid" : 0,
+                               "args" : { "rss_mb" : round(current / 2**20, 1) } })
+        return False
+
+
+class Timed:
+
+    def __init__(self, tracer, name, category, frame):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.frame = frame
+
+    def __enter__(self):
+        self.start = now()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = now()
+        tracer = self.tracer
+
+        if self.category == "frame":
+            tracer.current_frame = None
+
+        tracer.step_times.setdefault(self.name, []).append((end - self.start, self.frame))
+        tracer.complete(self.name, self.category, self.start, end, { "frame" : self.frame })
+        return False
+
+
+class Tracer:
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.stack = []
+        self.step_times = {}
+        self.current_frame = None
+        self.pid = os.getpid()
+        self.worker = False
+
+    def start(self):
+        self.enabled = True
+
+    # In a worker process forked from a traced program - forget the parent's events, since the parent saves those itself
+    # Workers don't run atexit functions, so they save their own trace (see worker_trace_file) whenever they finish some work
+    def start_worker(self):
+        self.events = []
+        self.stack = []
+        self.step_times = {}
+        self.pid = os.getpid()
+        self.worker = True
+
+    def complete(self, name, category, start, end, args):
+        self.events.append({ "name" : name, "cat" : category, "ph" : "X", "ts" : start, "dur" : end - start,
+                             "pid" : self.pid, "tid" : 0, "args" : args })
+
+    # A stage of a program, e.g. with stage("interpolation"): ... - any keyword arguments get saved with it
+    def stage(self, name, **args):
+        return Stage(self, name, args) if self.enabled else disabled
+
+    # Drawing and saving one frame of an animation - the steps inside it get counted towards it
+    def frame(self, i):
+        if not self.enabled:
+            return disabled
+
+        self.current_frame = int(i)
+        return Timed(self, "frame", "frame", self.current_frame)
+
+    # One step of drawing a frame (sort, colour, draw, encode)
+    def step(self, name):
+        return Timed(self, name, "step", self.current_frame) if self.enabled else disabled
+
+    # For each step (and whole frames) - how many times it ran, the total/mean/percentiles in milliseconds, a histogram and the slowest frames
+    def step_summary(self):
+        summary = {}
+
+        for name, times in self.step_times.items():
+            durations = np.array([duration for duration,_ in times]) / 1000
+            frames = [frame for _,frame in times]
+
+            # Log-spaced bins, since a few very slow frames are exactly what we're looking for
+            low = max(durations.min(), 1e-3)
+            high = max(durations.max(), low) * 1.0001
+            counts, edges = np.histogram(durations, bins=np.geomspace(low, high, 21))
+            slowest = np.argsort(-durations, kind="stable")[:slowest_count]
+
+            summary[name] = { "count" : len(durations),
+                              "total_ms" : round(float(durations.sum()), 3),
+                              "mean_ms" : round(float(durations.mean()), 3),
+                              "p50_ms" : round(float(np.percentile(durations, 50)), 3),
+                              "p90_ms" : round(float(np.percentile(durations, 90)), 3),
+                              "p99_ms" : round(float(np.percentile(durations, 99)), 3),
+                              "max_ms" : round(float(durations.max()), 3),
+                              "histogram" : { "edges_ms" : [round(float(edge), 4) for edge in edges],
+                                              "counts" : counts.tolist() },
+                              "slowest_frames" : [ { "frame" : frames[ind], "ms" : round(float(durations[ind]), 3) }
+                                                   for ind in slowest ] }
+
+        return summary
+
+    def save(self, filename):
+        metadata = [ { "name" : "process_name", "ph" : "M", "pid" : self.pid, "tid" : 0,
+                       "args" : { "name" : os.path.basename(sys.argv[0]) or "python" } } ]
+
+        with open(filename, "w") as f:
+            json.dump({ "traceEvents" : metadata + self.events,
+                        "displayTimeUnit" : "ms",
+                        "otherData" : { "frame_steps" : self.step_summary() } }, f)
+
+
+# Where a worker process saves its trace - next to the main one, with the process id in the name
+def worker_trace_file():
+    root, extension = os.path.splitext(trace_file or "trace.json")
+    return f"{root}.{os.getpid()}{extension}"
+
+
+tracer = Tracer()
+
+stage = tracer.stage
+frame = tracer.frame
+step = tracer.step
+
+if trace_file:
+    tracer.start()
+    atexit.register(tracer.save, trace_file)
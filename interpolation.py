@@ -0,0 +1,65 @@
+import numpy as np
+
+# Linear interpolation of a whole names x years matrix at once, used to turn 1 column per year into `extent` frames per year.
+# This does the same thing as the old interpolate_list in animated_plot.py, but on every row together using broadcasting.
+# Interpolated column c sits between original columns c // extent and c // extent + 1, (c % extent) / extent of the way along,
+# and the last original column is kept as it is, so n columns become extent * (n-1) + 1 of them.
+
+
+# How many columns there are after interpolating ncolumns columns
+def interpolated_length(ncolumns, extent):
+    return extent * (ncolumns - 1) + 1 if ncolumns else 0
+
+
+# Work out just the interpolated columns we ask for (an array of column indices) - the last axis is the one that gets interpolated
+# so this works for a single list of years as well as a names x years matrix
+def interpolate_columns(matrix, extent, columns):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    columns = np.asarray(columns, dtype=np.intp)
+
+    ncolumns = matrix.shape[-1]
+
+    # With only 1 column there's nothing to interpolate between
+    if ncolumns == 1:
+        return matrix[..., np.zeros(len(columns), dtype=np.intp)]
+
+    # The original column to the left of each interpolated one, and how far along towards the next one it is
+    # The very last column has no right-hand neighbour so it borrows the previous pair and gets an exact copy below
+    left = np.minimum(columns // extent, ncolumns - 2)
+    step = columns - left * extent
+    fraction = step / extent
+
+    # This is just the interpolation formula
+    before = matrix[..., left]
+    after = matrix[..., left + 1]
+    result = before + (after - before) * fraction
+
+    # Don't want rounding error to creep into the final value
+    at_end = step == extent
+    result[..., at_end] = after[..., at_end]
+
+    return result
+
+
+# Interpolate the whole matrix in one go
+def interpolate_matrix(matrix, extent):
+    return interpolate_columns(matrix, extent, np.arange(interpolated_length(np.shape(matrix)[-1], extent)))
+
+
+# The lazy version - nothing gets interpolated until a frame asks for it, and then only the columns that frame shows
+# This means memory doesn't grow with the interpolation extent, only with how wide the window is
+class InterpolatedMatrix:
+
+    def __init__(self, matrix, extent):
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.extent = extent
+
+    # The number of interpolated columns
+    def __len__(self):
+        return interpolated_length(self.matrix.shape[-1], self.extent)
+
+    # Same as slicing [start:start+size] on the fully interpolated matrix (so it gets cut short at the end in the same way)
+    # If rows is given, only those rows get interpolated (in that order) - a frame only ever shows N of them
+    def window(self, start, size, rows=None):
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return interpolate_columns(matrix, self.extent, np.arange(start, min(start + size, len(self))))
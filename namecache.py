@@ -0,0 +1,240 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from instrument import stage
+
+# This module keeps a compact binary copy of every yobYYYY.txt file so the plotting scripts don't have to parse
+# 140 csvs every time they start. The first run parses everything and writes the cache, later runs just memory-map it.
+# If a yob file changes size or modification time (or a new one appears), only that year gets parsed again.
+
+# Where the yob files live by default, and the folder (inside it) where the cache is kept
+data_folder = "baby_Names"
+cache_folder_name = "cache"
+
+# Bump this if the layout of the cache ever changes so that old caches get thrown away instead of misread
+cache_version = 2
+
+# The same column names the plotting scripts use when they read a csv
+column_names = ["name","sex","quantity"]
+
+# The table is stored column by column in one file - the 4 byte columns go first so that every column stays aligned
+# name is the interned id of the name (an index into the names array), sex is 0 for F and 1 for M
+columns = [("name", np.uint32), ("count", np.uint32), ("year", np.uint16), ("sex", np.uint8)]
+
+sex_codes = {"F" : 0, "M" : 1}
+sex_letters = np.array(["F","M"])
+
+
+# Get the year out of a filename like yob1947.txt, or None if it isn't a yob file
+def year_of_file(filename):
+    if filename.startswith("yob") and filename.endswith(".txt") and filename[3:-4].isdigit():
+        return int(filename[3:-4])
+    return None
+
+
+# Find every yob file in the folder along with the size and mtime we use to tell whether it has changed
+# Returns { year : [size, mtime_ns] }
+def scan_folder(folder=data_folder):
+    found = {}
+
+    for entry in os.scandir(folder):
+        year = year_of_file(entry.name)
+
+        if year is not None and entry.is_file():
+            stat = entry.stat()
+            found[year] = [stat.st_size, stat.st_mtime_ns]
+
+    return found
+
+
+# The years we have data for, in order
+def available_years(folder=data_folder):
+    return np.array(sorted(scan_folder(folder)))
+
+
+# Parse a single year the slow way - this is the only place the csvs are actually read
+def parse_year(folder, year):
+    # keep_default_na is off since some real names (e.g. "Nan") would otherwise turn into missing values
+    return pd.read_csv(os.path.join(folder, f"yob{year}.txt"), names=column_names,
+                       keep_default_na=False, dtype={"name" : str, "sex" : str, "quantity" : np.uint32})
+
+
+# The cached table - every attribute is a numpy array (the columns are memory-mapped, so nothing is read until it's needed)
+# year_rows maps each year to the [start, stop) slice of rows that came from its file, in the same order as the file
+class NameTable:
+
+    def __init__(self, name, count, year, sex, names, year_rows):
+        self.name = name
+        self.count = count
+        self.year = year
+        self.sex = sex
+        self.names = names
+        self.year_rows = year_rows
+
+    def __len__(self):
+        return len(self.count)
+
+    # The years in the table, in order
+    @property
+    def years(self):
+        return np.array(sorted(self.year_rows))
+
+
+def cache_paths(folder):
+    cache_folder = os.path.join(folder, cache_folder_name)
+
+    return ( cache_folder,
+             os.path.join(cache_folder, "manifest.json"),
+             os.path.join(cache_folder, "table.bin"),
+             os.path.join(cache_folder, "names.npy") )
+
+
+# Read the manifest if it's there and it's one we understand, otherwise None
+def read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("version") != cache_version:
+        return None
+
+    return manifest
+
+
+# Memory-map the columns of table.bin - the manifest tells us how many rows there are
+def map_columns(table_path, nrows):
+    mapped = {}
+    offset = 0
+
+    for column, dtype in columns:
+        # np.memmap refuses to map zero bytes so an empty table just gets empty arrays
+        if nrows == 0:
+            mapped[column] = np.zeros(0, dtype=dtype)
+        else:
+            mapped[column] = np.memmap(table_path, dtype=dtype, mode="r", offset=offset, shape=(nrows,))
+        offset += nrows * np.dtype(dtype).itemsize
+
+    return mapped
+
+
+# Whether table.bin and names.npy are the ones the manifest was written for - if a crash left the new data files next to the old
+# manifest, its row counts would get applied to the wrong file
+def cache_matches(manifest, table_path, names_path):
+    row_bytes = sum(np.dtype(dtype).itemsize for _, dtype in columns)
+
+    try:
+        if os.path.getsize(table_path) != manifest["rows"] * row_bytes:
+            return False
+        return manifest["rows"] == 0 or len(np.load(names_path, mmap_mode="r")) == manifest["names"]
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def open_table(manifest, table_path, names_path):
+    mapped = map_columns(table_path, manifest["rows"])
+    names = np.load(names_path, mmap_mode="r") if manifest["rows"] else np.zeros(0, dtype=str)
+
+    year_rows = { int(year) : tuple(info["rows"]) for year,info in manifest["years"].items() }
+
+    return NameTable(mapped["name"], mapped["count"], mapped["year"], mapped["sex"], names, year_rows)
+
+
+# Load the whole dataset, building or refreshing the cache first if any yob file has changed since it was written
+def load_table(folder=data_folder):
+
+    cache_folder, manifest_path, table_path, names_path = cache_paths(folder)
+
+    on_disk = scan_folder(folder)
+    manifest = read_manifest(manifest_path)
+
+    if manifest is not None and not cache_matches(manifest, table_path, names_path):
+        manifest = None
+
+    # Years whose cached copy is still good - same size and mtime as the file we parsed it from
+    if manifest is None:
+        fresh = {}
+    else:
+        fresh = { int(year) : info for year,info in manifest["years"].items()
+                  if on_disk.get(int(year)) == info["stat"] }
+
+    # Nothing has changed so just map what we have
+    if manifest is not None and len(fresh) == len(manifest["years"]) and set(fresh) == set(on_disk):
+        return open_table(manifest, table_path, names_path)
+
+    os.makedirs(cache_folder, exist_ok=True)
+
+    # Reuse whatever we can from the old cache - the name ids have to stay the same so anything we've already
+    # interned keeps its id and new names get added onto the end
+    if manifest is not None and fresh:
+        old = open_table(manifest, table_path, names_path)
+        names = list(old.names)
+    else:
+        old = None
+        names = []
+
+    name_ids = { name : ind for ind,name in enumerate(names) }
+
+    # Every year's columns, in year order - unchanged years get copied straight out of the old cache
+    pieces = []
+
+    for year in sorted(on_disk):
+        if year in fresh:
+            start, stop = old.year_rows[year]
+            pieces.append([np.array(old.name[start:stop]), np.array(old.count[start:stop]),
+                           np.array(old.sex[start:stop])])
+            continue
+
+        with stage("parse_csv", year=year):
+            this_years_csv = parse_year(folder, year)
+
+        # Intern any names we've never seen before
+        for person in this_years_csv["name"].unique():
+            if person not in name_ids:
+                name_ids[person] = len(names)
+                names.append(person)
+
+        ids = this_years_csv["name"].map(name_ids).to_numpy(dtype=np.uint32)
+        sexes = this_years_csv["sex"].map(sex_codes).to_numpy(dtype=np.uint8)
+
+        pieces.append([ids, this_years_csv["quantity"].to_numpy(dtype=np.uint32), sexes])
+
+    # Now lay the new table out and write it next to the old one, then swap it in - the manifest goes first and comes back last,
+    # so a crash halfway through leaves no manifest (and the next run builds the cache again) rather than one for the wrong files
+    lengths = [len(piece[0]) for piece in pieces]
+    bounds = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+    years_column = np.repeat(np.array(sorted(on_disk), dtype=np.uint16), lengths)
+
+    new_columns = { "name" : np.concatenate([p[0] for p in pieces]) if pieces else np.zeros(0, np.uint32),
+                    "count" : np.concatenate([p[1] for p in pieces]) if pieces else np.zeros(0, np.uint32),
+                    "year" : years_column,
+                    "sex" : np.concatenate([p[2] for p in pieces]) if pieces else np.zeros(0, np.uint8) }
+
+    # Drop our references to the old memory maps before replacing the files underneath them
+    del old
+
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    with open(table_path + ".tmp", "wb") as f:
+        for column, dtype in columns:
+            f.write(new_columns[column].astype(dtype, copy=False).tobytes())
+    os.replace(table_path + ".tmp", table_path)
+
+    # np.save adds .npy itself if the name doesn't already end with it
+    np.save(names_path + ".tmp.npy", np.array(names, dtype=str))
+    os.replace(names_path + ".tmp.npy", names_path)
+
+    manifest = { "version" : cache_version,
+                 "rows" : int(bounds[-1]),
+                 "names" : len(names),
+                 "years" : { str(year) : { "stat" : on_disk[year], "rows" : [int(bounds[ind]), int(bounds[ind+1])] }
+                             for ind,year in enumerate(sorted(on_disk)) } }
+
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    return open_table(manifest, table_path, names_path)
@@ -0,0 +1,84 @@
+import numpy as np
+from namecache import data_folder, sex_codes
+from headreader import load_offsets, read_head
+
+# This module replaces the gender_dict loop that used to be copied into all 3 plotting scripts.
+# Instead of growing a list per name every year, we pick out the top N rows of every year in one go from the cached table
+# and scatter them into a dense array with one row per name and one column per year.
+# E.g from 1955-1960 with names [Lisa, Mark] the matrix would be [[0, 12.1, 13.8, 14.9, 14.7, 14.6], [6.7, 6.3, 8.6, 9.1, 2.4, 8.6]]
+
+
+# Given the table from namecache, find the top N names of one sex for every year from start to end (inclusive)
+# Returns the matrix of percentages (of the top N total for that year), the names for each row and a dict going back from name to row
+# The rows are ordered by when the name first made the top N, and then by its rank in that year
+def top_matrix(table, sex, topN, start, end):
+
+    years = np.arange(start, end+1)
+
+    # All the rows of the sex we want in the years we want - the table keeps the rows in the same order as the files,
+    # so within each year they are already sorted from most to least popular
+    year_column = np.asarray(table.year)
+    selected = np.flatnonzero( (year_column >= start) & (year_column <= end) & (np.asarray(table.sex) == sex_codes[sex]) )
+    selected_years = year_column[selected]
+
+    # Each name's rank within its year is just how far it is from the first selected row of that year
+    positions = np.arange(len(selected))
+    first_of_year = np.ones(len(selected), dtype=bool)
+    first_of_year[1:] = selected_years[1:] != selected_years[:-1]
+    ranks = positions - np.maximum.accumulate(np.where(first_of_year, positions, 0))
+
+    # Only keep the top N of each year
+    top = selected[ranks < topN]
+    ids = np.asarray(table.name)[top]
+    quantities = np.asarray(table.count)[top]
+    columns = year_column[top].astype(np.intp) - start
+
+    return build_matrix(ids, quantities, columns, len(years), table.names)
+
+
+# Scatter the top N rows of every year into the matrix - ids are name ids (indexes into all_names), columns are year - start,
+# and the rows have to be in year order and then rank order like they are in the files
+def build_matrix(ids, quantities, columns, nyears, all_names):
+
+    quantities = np.asarray(quantities, dtype=np.float64)
+
+    # Convert the raw quantities into percentages of that year's top N total
+    year_totals = np.bincount(columns, weights=quantities, minlength=nyears)
+    percentages = quantities * 100 / year_totals[columns]
+
+    # Give every name a row - np.unique sorts by id, so reorder so that the rows go by first appearance instead
+    unique_ids, first_seen, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    appearance_order = np.argsort(first_seen, kind="stable")
+    row_of_unique = np.empty(len(unique_ids), dtype=np.intp)
+    row_of_unique[appearance_order] = np.arange(len(unique_ids))
+
+    # Anyone who isn't in the top N for a year gets 0% for it
+    matrix = np.zeros((len(unique_ids), nyears))
+    matrix[row_of_unique[inverse], columns] = percentages
+
+    names = [str(all_names[ind]) for ind in unique_ids[appearance_order]]
+    name_index = { name : row for row,name in enumerate(names) }
+
+    return matrix, names, name_index
+
+
+# Same as top_matrix but reads only the first topN rows of each year straight from the yob files (see headreader.py),
+# which is much less work than loading the whole table when that's all that's needed
+def head_matrix(sex, topN, start, end, folder=data_folder):
+
+    offsets = load_offsets(folder)
+    name_ids = {}
+    ids, quantities, columns = [], [], []
+
+    for year in range(start, end+1):
+        for name, quantity in read_head(folder, year, sex, topN, offsets[year]):
+            ids.append(name_ids.setdefault(name, len(name_ids)))
+            quantities.append(quantity)
+            columns.append(year - start)
+
+    return build_matrix(np.array(ids, dtype=np.intp), quantities, np.array(columns, dtype=np.intp), end - start + 1, list(name_ids))
+
+
+# The top N matrix for the plotting scripts - only the top N rows are needed so the head reader is all it takes
+def load_matrix(sex, topN, start, end, folder=data_folder):
+    return head_matrix(sex, topN, start, end, folder)
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+from namecache import load_table, data_folder, sex_codes
+
+# Answers questions like "what was Linda's share in 1947" or "who was 3rd for girls in 1990" straight from the cached table,
+# for every name in the data rather than just the ones that made the top 10.
+# Every yob file is sorted from most to least popular within each sex, so a name's rank is just how far its row is from the
+# first row of its sex that year - nothing needs sorting. On top of that there's an index from (name, sex) to that name's rows,
+# in year order, so a name's whole history is one slice.
+#
+# query = load_query()
+# query.share("Linda", 1947, "F")      -> percentage of girls born in 1947 called Linda
+# query.name_at(3, 1990, "F")          -> the 3rd most popular girls' name of 1990
+# query.lookup(["Linda","Mary"], 1947, "F") -> counts, shares and ranks for lots of names at once
+
+
+# Raise ValueError if any of the sexes isn't F or M - every lookup checks this first, so a bad one always gets the same error
+def check_sexes(*sexes):
+    unknown = set(sexes) - set(sex_codes)
+    if unknown:
+        raise ValueError(f"Unknown sex {sorted(unknown, key=str)[0]!r} - it should be one of {', '.join(sex_codes)}")
+
+
+class NameQuery:
+
+    def __init__(self, table):
+        self.table = table
+        self.names = table.names
+
+        # The interned name dictionary - pandas does the name -> id lookups for the batched queries in one go
+        self.name_index = pd.Index(np.asarray(table.names))
+
+        years = table.years
+        self.first_year = int(years[0]) if len(years) else 0
+        self.nyears = int(years[-1]) - self.first_year + 1 if len(years) else 0
+
+        year = np.asarray(table.year).astype(np.intp) - self.first_year
+        sex = np.asarray(table.sex).astype(np.intp)
+        name = np.asarray(table.name).astype(np.intp)
+        self.count = np.asarray(table.count)
+
+        # Where each (year, sex) block starts in the table, how many names it has and how many babies
+        # The table goes year by year with the F block before the M block, so the blocks are already in this order
+        blocks = year * 2 + sex
+        self.block_sizes = np.bincount(blocks, minlength=self.nyears * 2)
+        self.block_starts = np.cumsum(self.block_sizes) - self.block_sizes
+        self.totals = np.bincount(blocks, weights=self.count, minlength=self.nyears * 2)
+
+        # Each row's rank within its year and sex, starting from 1
+        self.ranks = np.arange(len(blocks)) - self.block_starts[blocks] + 1
+
+        # Rows grouped by (name, sex) - the table is in year order, so a stable sort keeps each group in year order too
+        groups = name * 2 + sex
+        self.order = np.argsort(groups, kind="stable")
+        self.keys = groups[self.order] * self.nyears + year[self.order]
+        self.group_starts = np.concatenate([[0], np.cumsum(np.bincount(groups, minlength=len(self.names) * 2))])
+
+    def name_id(self, name):
+        ids = self.name_index.get_indexer([name])
+        return int(ids[0]) if ids[0] >= 0 else None
+
+    # The row of the table for this name, year and sex, or None if no babies got that name that year
+    def row(self, name, year, sex):
+        check_sexes(sex)
+        name = self.name_id(name)
+        column = year - self.first_year
+
+        if name is None or not 0 <= column < self.nyears:
+            return None
+
+        # Only this name's own rows (at most one per year) need searching
+        group = name * 2 + sex_codes[sex]
+        lo, hi = self.group_starts[group], self.group_starts[group + 1]
+        key = group * self.nyears + column
+        pos = lo + np.searchsorted(self.keys[lo:hi], key)
+
+        return int(self.order[pos]) if pos < hi and self.keys[pos] == key else None
+
+    # How many babies of that sex got the name that year
+    def count_of(self, name, year, sex):
+        row = self.row(name, year, sex)
+        return 0 if row is None else int(self.count[row])
+
+    # The percentage of all babies of that sex born that year who got the name
+    def share(self, name, year, sex):
+        row = self.row(name, year, sex)
+        return 0.0 if row is None else float(self.count[row] * 100 / self.totals[(year - self.first_year) * 2 + sex_codes[sex]])
+
+    # The name's rank that year (1 for the most popular), or None if it wasn't given at all
+    def rank(self, name, year, sex):
+        row = self.row(name, year, sex)
+        return None if row is None else int(self.ranks[row])
+
+    # The name at a given rank (1 for the most popular) that year, or None if there weren't that many names
+    def name_at(self, rank, year, sex):
+        check_sexes(sex)
+        column = year - self.first_year
+
+        if not 0 <= column < self.nyears:
+            return None
+
+        block = column * 2 + sex_codes[sex]
+        if not 1 <= rank <= self.block_sizes[block]:
+            return None
+
+        return str(self.names[self.table.name[self.block_starts[block] + rank - 1]])
+
+    # Every year of a name's history - returns the years, counts, shares (percent) and ranks (0 for the years it wasn't given)
+    def series(self, name, sex):
+        check_sexes(sex)
+        years = np.arange(self.first_year, self.first_year + self.nyears)
+        counts = np.zeros(self.nyears, dtype=np.int64)
+        shares = np.zeros(self.nyears)
+        ranks = np.zeros(self.nyears, dtype=np.int64)
+
+        name = self.name_id(name)
+        if name is None:
+            return years, counts, shares, ranks
+
+        group = name * 2 + sex_codes[sex]
+        rows = self.order[self.group_starts[group]:self.group_starts[group + 1]]
+        columns = self.keys[self.group_starts[group]:self.group_starts[group + 1]] - group * self.nyears
+
+        counts[columns] = self.count[rows]
+        shares[columns] = self.count[rows] * 100 / self.totals[columns * 2 + sex_codes[sex]]
+        ranks[columns] = self.ranks[rows]
+
+        return years, counts, shares, ranks
+
+    # Look up lots of names at once - names, years and sexes can each be a single value or a list (they're broadcast together)
+    # Returns arrays of counts, shares (percent) and ranks, with 0 wherever the name wasn't given that year
+    def lookup(self, names, years, sexes):
+        names = np.atleast_1d(np.asarray(names, dtype=object))
+        years = np.atleast_1d(np.asarray(years, dtype=np.intp))
+        sexes = np.atleast_1d(np.asarray(sexes, dtype=object))
+
+        names, years, sexes = np.broadcast_arrays(names, years, sexes)
+
+        ids = self.name_index.get_indexer(names.ravel()).reshape(names.shape)
+        check_sexes(*sexes.ravel())
+        sex = np.where(sexes == "M", sex_codes["M"], sex_codes["F"])
+        columns = years - self.first_year
+
+        valid = (ids >= 0) & (columns >= 0) & (columns < self.nyears)
+        keys = np.where(valid, (ids * 2 + sex) * self.nyears + columns, -1)
+
+        # Every key is looked up in one go with a binary search over the whole index
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = valid & (self.keys[pos] == keys)
+        rows = self.order[pos]
+
+        counts = np.where(found, self.count[rows], 0)
+        totals = self.totals[np.where(valid, columns * 2 + sex, 0)]
+        shares = np.where(found, counts * 100 / np.where(found, totals, 1), 0.0)
+        ranks = np.where(found, self.ranks[rows], 0)
+
+        return counts, shares, ranks
+
+
+def load_query(folder=data_folder):
+    return NameQuery(load_table(folder))
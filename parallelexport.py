@@ -0,0 +1,123 @@
+import os
+import subprocess
+import tempfile
+import multiprocessing
+from videopipe import stream_video
+from instrument import tracer, worker_trace_file
+
+# Renders the animation on several processes at once. The frames are split into chunks, each worker process draws its chunks
+# into separate video files, and then the pieces are joined back together in order into one video.
+# Every frame is worked out from the FrameSource alone (the colours are all decided up front), so the chunks don't depend on each other
+# and the result is the same as drawing every frame one after another.
+
+# Set by init_worker in each worker process - the source is sent to each worker once when it starts rather than with every chunk
+worker_source = None
+worker_renderer = None
+
+
+def init_worker(source):
+    global worker_source, worker_renderer
+
+    # Workers never show anything on screen
+    import matplotlib
+    matplotlib.use("Agg")
+
+    worker_source = source
+    worker_renderer = source.make_renderer()
+
+    if tracer.enabled:
+        tracer.start_worker()
+
+
+# Draw frames [first, last) into their own video file, streaming them straight into ffmpeg
+# The video is written under a temporary name first, so a file with the proper name is always a finished one
+def render_chunk(task):
+    first, last, filename, fps = task
+
+    stream_video(worker_renderer, lambda i : worker_renderer.update(*worker_source.frame(i)), range(first, last), filename, fps)
+
+    if tracer.worker:
+        tracer.save(worker_trace_file())
+
+    return filename
+
+
+# Join video files together (in the order given) without re-encoding them
+def concat_videos(filenames, output):
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as listfile:
+        for filename in filenames:
+            listfile.write(f"file '{os.path.abspath(filename)}'\n")
+
+    try:
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                        "-i", listfile.name, "-c", "copy", output], check=True)
+    finally:
+        os.remove(listfile.name)
+
+
+# Split frames into chunks of (about) equal size
+def frame_chunks(frames, nchunks):
+    nchunks = max(1, min(nchunks, frames))
+    bounds = [ frames * chunk // nchunks for chunk in range(nchunks + 1) ]
+
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# How many frames go in each segment of the resumable and incremental exports - this is also how much work can be lost when a
+# render gets killed
+segment_frames = 500
+
+
+# Split frames into chunks of a fixed size (apart from the last one) - unlike frame_chunks, the boundaries stay put when
+# more frames are added onto the end, so the chunks before that don't change
+def fixed_chunks(frames, chunksize):
+    return [ (first, min(first + chunksize, frames)) for first in range(0, frames, chunksize) ]
+
+
+# The file frames [first, last) get saved to in a folder of segments
+def segment_name(folder, first, last, extension):
+    return os.path.join(folder, f"frames_{first:06d}_{last:06d}{extension}")
+
+
+# Render each (first, last) range of frames of the source into its own file in folder, and return the filenames in order
+# With more than one process the ranges get shared out over a pool of them, otherwise they're all drawn here
+# finished(first, last, filename) gets called (in this process) as soon as each one is done, in whatever order they finish
+def render_segments(source, ranges, folder, fps, extension=".mp4", processes=1, finished=None):
+
+    tasks = [ (first, last, segment_name(folder, first, last, extension), fps) for first,last in ranges ]
+
+    if processes <= 1:
+        global worker_source, worker_renderer
+        worker_source, worker_renderer = source, source.make_renderer()
+
+        for task in tasks:
+            render_chunk(task)
+            if finished is not None:
+                finished(*task[:3])
+
+        return [ task[2] for task in tasks ]
+
+    # Fork where we can so the workers don't have to import the main program again - otherwise fall back to the default
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    by_filename = { task[2] : task for task in tasks }
+
+    with context.Pool(processes, initializer=init_worker, initargs=(source,)) as pool:
+        for filename in pool.imap_unordered(render_chunk, tasks):
+            if finished is not None:
+                finished(*by_filename[filename][:3])
+
+    return [ task[2] for task in tasks ]
+
+
+# Render the first `frames` frames of the source into one video file using a pool of processes
+# There are chunks_per_process chunks for every process so that a worker that finishes early can pick up another one
+def export_parallel(source, frames, filename, fps, processes=None, chunks_per_process=4):
+
+    processes = processes or os.cpu_count()
+    extension = os.path.splitext(filename)[1]
+
+    with tempfile.TemporaryDirectory() as folder:
+        pieces = render_segments(source, frame_chunks(frames, processes * chunks_per_process), folder, fps, extension, processes)
+
+        concat_videos(pieces, filename)
@@ -0,0 +1,79 @@
+import numpy as np
+
+# Works out, before any drawing happens, which rows of the matrix are in the top N on every frame of the animation
+# Every frame used to sort every name to find its top 10 and then walk the whole dict again to get them back into their original order,
+# but all we really need is a small table with one row per frame, so that's what this makes.
+
+
+# Everything the animation needs to know about who is where on each frame - each attribute is a frames x N integer array
+# top   - the rows of the matrix in the top N, from most to least popular (ties go to the earlier row, like a stable sort would)
+# order - the same rows, but in the order they appear in the matrix, which is the order they get stacked in so stacks don't jump about
+# place - for each entry in order, its position in top (0 for 1st and so on), so the labels can show the ranking
+class RankTable:
+
+    __slots__ = ["top", "order", "place"]
+
+    def __init__(self, top, order, place):
+        self.top = top
+        self.order = order
+        self.place = place
+
+    def __len__(self):
+        return len(self.top)
+
+
+# Find the top N rows at every one of the given (interpolated) columns
+# values is anything with a window(start, size) method like InterpolatedMatrix, and frames is how many frames there are
+# The frames are worked through in chunks so that we never have more than chunksize interpolated columns in memory at once
+# If only the frames from `first` onwards have changed (e.g. a new year was added), pass the old table as previous and its
+# earlier frames get copied over instead of worked out again
+def rank_frames(values, topN, frames, chunksize=2000, previous=None, first=0):
+
+    nrows = values.matrix.shape[0]
+    N = min(topN, nrows)
+
+    # The row numbers all fit in a much smaller integer type than the default one
+    dtype = np.min_scalar_type(max(nrows - 1, 0))
+
+    top = np.empty((frames, N), dtype=dtype)
+    order = np.empty((frames, N), dtype=dtype)
+    place = np.empty((frames, N), dtype=np.min_scalar_type(max(N - 1, 0)))
+
+    if previous is None or previous.top.shape[1] != N:
+        first = 0
+    else:
+        first = min(first, len(previous), frames)
+        top[:first] = previous.top[:first]
+        order[:first] = previous.order[:first]
+        place[:first] = previous.place[:first]
+
+    for chunkstart in range(first, frames, chunksize):
+        chunkend = min(chunkstart + chunksize, frames)
+
+        # One row per frame, one column per name
+        chunk = values.window(chunkstart, chunkend - chunkstart).T
+
+        # Partial selection - we don't care what order the top N are in yet or about anyone outside it, so there's no need for a full sort
+        if N < nrows:
+            chosen = np.argpartition(-chunk, N - 1, axis=1)[:, :N]
+
+            # argpartition doesn't say which of several equal values at the cutoff get in, so on frames where a tie crosses it
+            # (e.g. names that are still 0) the top N come from a stable sort instead, which picks the earlier rows
+            cutoff = np.take_along_axis(chunk, chosen, axis=1).min(axis=1)
+            tied = np.flatnonzero((chunk >= cutoff[:, None]).sum(axis=1) > N)
+
+            if len(tied):
+                chosen[tied] = np.argsort(-chunk[tied], axis=1, kind="stable")[:, :N]
+        else:
+            chosen = np.broadcast_to(np.arange(nrows), (len(chunk), nrows))
+
+        # Putting the rows back in matrix order gives us the stacking order, then a stable sort of that by popularity gives us the ranking
+        chunk_order = np.sort(chosen, axis=1)
+        popularity = np.take_along_axis(chunk, chunk_order, axis=1)
+        by_popularity = np.argsort(-popularity, axis=1, kind="stable")
+
+        top[chunkstart:chunkend] = np.take_along_axis(chunk_order, by_popularity, axis=1)
+        order[chunkstart:chunkend] = chunk_order
+        place[chunkstart:chunkend] = np.argsort(by_popularity, axis=1)
+
+    return RankTable(top, order, place)
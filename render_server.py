@@ -0,0 +1,205 @@
+import io
+import sys
+import threading
+import multiprocessing
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import matplotlib.pyplot as plt
+from namecache import available_years, data_folder
+from batch_render import SharedData, total_figure
+
+# Serves the all-time stackplots as images over http, so a website can ask for any of them without running alltime_plot.py each time.
+# The data is loaded once when the server starts, the matrices stay in memory after the first time they're needed, and the drawing is
+# shared out over a pool of processes (matplotlib can't draw on several threads at once). Finished images are kept in a cache so asking
+# for the same one again is instant - the least recently used ones are thrown out once the cache gets too big.
+# python render_server.py (or python render_server.py 8080 for a different port), then e.g.
+# http://127.0.0.1:8050/render?style=alltime&sex=F&topN=10&start=1880&end=2019&format=png
+# style is alltime or pretty, format is png or svg, and all_names=1 plots every name like alltime_plot's all_names
+
+host = "127.0.0.1"
+port = 8050
+
+# How many processes draw images, and how big the image cache can get (in bytes)
+processes = None
+cache_bytes = 256 * 2**20
+
+# How many matrices (and all-names counts) each drawing process keeps between requests, and the biggest topN anyone can ask for -
+# both are up to whoever is asking, so without a limit the server would keep growing
+memo_items = 16
+max_topN = 1000
+
+content_types = { "png" : "image/png", "svg" : "image/svg+xml" }
+
+# Set by init_worker in each worker process
+worker_shared = None
+
+
+def init_worker(shared):
+    global worker_shared
+    worker_shared = shared
+
+
+# Draw one image in a worker process and return its bytes
+def render_image(job):
+    fig = total_figure(worker_shared, job)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=job["format"])
+    plt.close(fig)
+
+    return buffer.getvalue()
+
+
+# A dict that remembers which keys were used most recently and forgets the oldest ones once the values add up to more than maxbytes
+class LRUCache:
+
+    def __init__(self, maxbytes):
+        self.maxbytes = maxbytes
+        self.size = 0
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                return None
+
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value):
+        # Anything bigger than the whole cache would just push everything else out and then be thrown out itself
+        if len(value) > self.maxbytes:
+            return
+
+        with self.lock:
+            if key in self.items:
+                self.size -= len(self.items.pop(key))
+
+            self.items[key] = value
+            self.size += len(value)
+
+            while self.size > self.maxbytes:
+                _, oldest = self.items.popitem(last=False)
+                self.size -= len(oldest)
+
+
+# Turn the query string into a job for total_figure, or raise ValueError saying what's wrong with it
+def parse_job(query, years):
+    params = { key : values[-1] for key,values in parse_qs(query).items() }
+
+    try:
+        job = { "style" : params.get("style", "alltime"),
+                "sex" : params.get("sex", "F").upper(),
+                "topN" : int(params.get("topN", 10)),
+                "start" : int(params.get("start", years[0])),
+                "end" : int(params.get("end", years[-1])),
+                "all_names" : params.get("all_names", "0").lower() in ("1", "true", "yes"),
+                "format" : params.get("format", "png").lower() }
+    except ValueError:
+        raise ValueError("topN, start and end have to be whole numbers")
+
+    if job["style"] not in ("alltime", "pretty"):
+        raise ValueError("style has to be alltime or pretty")
+    if job["sex"] not in ("F", "M"):
+        raise ValueError("sex has to be F or M")
+    if not 1 <= job["topN"] <= max_topN:
+        raise ValueError(f"topN has to be between 1 and {max_topN}")
+    if not years[0] <= job["start"] <= job["end"] <= years[-1]:
+        raise ValueError(f"start and end have to be in order and between {years[0]} and {years[-1]}")
+    if job["format"] not in content_types:
+        raise ValueError(f"format has to be one of {', '.join(content_types)}")
+
+    # Every name is plotted either way with all_names, so topN makes no difference to the picture
+    if job["all_names"]:
+        job["topN"] = 0
+
+    return job
+
+
+class RenderServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, address, folder=data_folder, processes=processes, cache_bytes=cache_bytes):
+        years = available_years(folder)
+        self.years = (int(years[0]), int(years[-1]))
+
+        # Load the data before starting the workers so they all share this copy of it (fork where we can), along with the
+        # matrices for the plots alltime_plot makes by default
+        shared = SharedData(folder, memo_items)
+        for sex in ("F", "M"):
+            shared.matrix(sex, 10, *self.years)
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+        self.pool = context.Pool(processes, initializer=init_worker, initargs=(shared,))
+        self.cache = LRUCache(cache_bytes)
+
+        super().__init__(address, RenderHandler)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.terminate()
+
+    # The image for a job, from the cache if it's there
+    def image(self, job):
+        key = tuple(sorted(job.items()))
+        image = self.cache.get(key)
+
+        if image is not None:
+            return image, True
+
+        image = self.pool.apply(render_image, (job,))
+        self.cache.put(key, image)
+
+        return image, False
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+
+        if url.path != "/render":
+            return self.reply(404, "text/plain", b"Not found - images are at /render")
+
+        try:
+            job = parse_job(url.query, self.server.years)
+        except ValueError as error:
+            return self.reply(400, "text/plain", str(error).encode())
+
+        try:
+            image, cached = self.server.image(job)
+        except Exception as error:
+            return self.reply(500, "text/plain", f"Couldn't draw the image: {error}".encode())
+
+        self.reply(200, content_types[job["format"]], image, { "X-Cache" : "hit" if cached else "miss" })
+
+    def reply(self, status, content_type, body, headers={}):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        port = int(sys.argv[1])
+
+    server = RenderServer((host, port))
+    print(f"Serving on http://{host}:{port}/render")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,108 @@
+import os
+import json
+import hashlib
+from videopipe import encoder_args
+from parallelexport import segment_frames, fixed_chunks, segment_name, render_segments, concat_videos
+
+# Exports the animation as a folder of numbered segments with a checkpoint, so that a render that gets killed halfway through
+# can carry on where it left off instead of starting again from frame 0.
+# checkpoint.json in the segment folder has a hash of everything that decides what the frames look like, and the segments
+# that have been finished so far - it's updated as soon as each one is done. When the export is run again:
+# -If the hash is the same, the finished segments are skipped (as long as their files are still there and the right size)
+# -If anything has changed (the data, topN, the colours, the encoder settings...) the old segments are thrown away
+# Each run can also be given just a range of frames to do, e.g. for sharing an animation out over several machines with the same
+# folder. Once every segment exists they're joined into the final video without being re-encoded.
+
+checkpoint_version = 1
+
+
+def checkpoint_path(folder):
+    return os.path.join(folder, "checkpoint.json")
+
+
+# A hash of everything that goes into the frames of the source and how they get encoded
+def config_hash(source, fps, extension):
+    digest = hashlib.sha256()
+
+    for array in (source.interpolated.matrix, source.rank_table.top, source.rank_table.order, source.colour_table):
+        digest.update(str(array.dtype).encode())
+        digest.update(str(array.shape).encode())
+        digest.update(array.tobytes())
+
+    digest.update(json.dumps([ checkpoint_version, list(source.names), list(source.colours), source.extent, source.xintervalsize,
+                               source.start, source.topN, source.gender, fps, extension, encoder_args[extension] ]).encode())
+
+    return digest.hexdigest()
+
+
+# The segments finished so far ({ "first-last" : size of the file }), or None if the checkpoint is missing or for something else
+def read_checkpoint(folder, config):
+    try:
+        with open(checkpoint_path(folder)) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if checkpoint.get("config") != config:
+        return None
+
+    return checkpoint["segments"]
+
+
+def write_checkpoint(folder, config, segments):
+    path = checkpoint_path(folder)
+
+    with open(path + ".tmp", "w") as f:
+        json.dump({ "config" : config, "segments" : segments }, f)
+    os.replace(path + ".tmp", path)
+
+
+# Render every segment with frames in [first, last) of the source (all of them by default) into folder, skipping any already done,
+# and join all the segments into filename once they're all there. Returns the (first, last) of each segment drawn this time
+def export_resumable(source, filename, fps, frame_range=None, folder=None, processes=1):
+
+    base, extension = os.path.splitext(filename)
+    folder = folder or base + "_segments"
+    os.makedirs(folder, exist_ok=True)
+
+    frames = len(source)
+    first, last = frame_range or (0, frames)
+
+    config = config_hash(source, fps, extension)
+    done = read_checkpoint(folder, config)
+
+    # The segments always start at multiples of segment_frames, so runs over different ranges all agree on where they are
+    segments = fixed_chunks(frames, segment_frames)
+    filenames = { (start, stop) : segment_name(folder, start, stop, extension) for start,stop in segments }
+
+    def finished_already(start, stop):
+        path = filenames[start, stop]
+        return os.path.exists(path) and done.get(f"{start}-{stop}") == os.path.getsize(path)
+
+    # If the checkpoint was for something else then none of its segments are any use
+    if done is None:
+        done = {}
+
+        for leftover in os.listdir(folder):
+            if leftover.startswith("frames_"):
+                os.remove(os.path.join(folder, leftover))
+
+    todo = [ (start, stop) for start,stop in segments
+             if start < last and stop > first and not finished_already(start, stop) ]
+
+    def finished(start, stop, path):
+        # Someone else may have finished other segments in the meantime, so read the checkpoint again before adding this one
+        done.update(read_checkpoint(folder, config) or {})
+        done[f"{start}-{stop}"] = os.path.getsize(path)
+        write_checkpoint(folder, config, done)
+
+    write_checkpoint(folder, config, done)
+    render_segments(source, todo, folder, fps, extension, processes, finished)
+
+    # Other runs over other ranges may have finished the rest by now
+    done.update(read_checkpoint(folder, config) or {})
+
+    if all(finished_already(start, stop) for start,stop in segments):
+        concat_videos([ filenames[segment] for segment in segments ], filename)
+
+    return todo
@@ -0,0 +1,116 @@
+import numpy as np
+from PIL import Image
+from instrument import stage, frame, step
+
+# A stackplot that gets drawn over and over again, like the animated one, doesn't need brand new artists every frame.
+# This renderer makes the stack polygons, legend and title once and then each frame only changes their vertices, colours and text.
+# Everything that never changes (the background, the y-axis and its label) is drawn once and saved, and each frame is then made by
+# pasting that saved background back and drawing only the artists that move on top of it (blitting).
+
+
+# Get the handles out of a legend - they were renamed in newer versions of matplotlib
+def legend_handles(legend):
+    return legend.legend_handles if hasattr(legend, "legend_handles") else legend.legendHandles
+
+
+class StackRenderer:
+
+    # nlayers is how many stacks there are every frame - these all get made now with no data in them
+    def __init__(self, fig, ax, nlayers, legend_loc="upper left", title_fontsize=22):
+        self.fig = fig
+        self.ax = ax
+        self.nlayers = nlayers
+
+        # Make the stacks with the ordinary stackplot so they look exactly the same as before, just with placeholder values
+        # The labels are placeholders too, but they can't start with _ or the legend would leave them out
+        self.layers = ax.stackplot([0, 1], np.zeros((nlayers, 2)), labels=[str(layer) for layer in range(nlayers)])
+        self.legend = ax.legend(loc=legend_loc)
+
+        self.title = ax.set_title("", fontsize=title_fontsize)
+
+        # Everything that changes from frame to frame, drawn in the same order as a normal full draw would (by zorder)
+        self.animated = sorted(list(self.layers) + [ax.xaxis, *ax.spines.values(), self.legend, self.title],
+                               key=lambda artist : artist.get_zorder())
+
+        self.background = None
+
+    # Change the artists to show a new frame - x is the x values, values is one row per stack (bottom first) and
+    # colours/labels go with each stack. Returns the artists that changed, like an animation function should
+    def update(self, x, values, colours, labels, title, xlim=None, xticks=None):
+
+        with step("update"):
+            x = np.asarray(x, dtype=np.float64)
+            tops = np.cumsum(values, axis=0)
+
+            # Each polygon goes along the bottom of its stack and back along the top, like the ones fill_between makes
+            for layer, stack in enumerate(self.layers):
+                bottom = tops[layer-1] if layer else np.zeros(len(x))
+                top = tops[layer]
+
+                vertices = np.concatenate([ [[x[0], top[0]]],
+                                            np.column_stack([x, bottom]),
+                                            np.column_stack([x[::-1], top[::-1]]) ])
+                stack.set_verts([vertices])
+                stack.set_facecolor(colours[layer])
+
+            # The legend keeps its own copies of the colours and labels
+            for handle, text, stack, colour, label in zip(legend_handles(self.legend), self.legend.get_texts(),
+                                                          self.layers, colours, labels):
+                handle.set_facecolor(colour)
+                text.set_text(label)
+                stack.set_label(label)
+
+            self.title.set_text(title)
+
+            if xticks is not None:
+                self.ax.set_xticks(xticks)
+            if xlim is not None:
+                self.ax.set_xlim(*xlim)
+
+        return self.animated
+
+    # Draw the whole figure once without the animated artists and keep it as the background every frame gets drawn on top of
+    def draw_background(self):
+        for artist in self.animated:
+            artist.set_animated(True)
+
+        canvas = self.fig.canvas
+        canvas.draw()
+        self.background = canvas.copy_from_bbox(self.fig.bbox)
+
+    # Draw the current frame by pasting the background back and drawing only the artists that change on top
+    # Returns the canvas's RGBA buffer (not a copy, so it's only good until the next frame gets drawn)
+    def blit(self):
+        if self.background is None:
+            self.draw_background()
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+
+        for artist in self.animated:
+            self.fig.draw_artist(artist)
+
+        return canvas.buffer_rgba()
+
+
+# Save an animation as a gif using the renderer - animate(i) should update the renderer for frame i
+# This does the same thing matplotlib's PillowWriter does, but each frame gets blitted instead of the whole figure being redrawn
+def save_gif(renderer, animate, frames, filename, fps):
+
+    if frames == 0:
+        raise ValueError("There are no frames to save")
+
+    width, height = renderer.fig.canvas.get_width_height(physical=True)
+    images = []
+
+    for i in range(frames):
+        with frame(i):
+            animate(i)
+
+            with step("draw"):
+                buffer = renderer.blit()
+            with step("encode"):
+                images.append(Image.frombuffer("RGBA", (width, height), bytes(buffer), "raw", "RGBA", 0, 1))
+
+    with stage("encode_gif"):
+        images[0].save(filename, save_all=True, append_images=images[1:], duration=int(1000 / fps), loop=0)
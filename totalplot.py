@@ -0,0 +1,40 @@
+import random
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.colors as mcolours
+from distribution import band_collection
+
+# The drawing part of alltime_plot.py and prettyplot.py, so the programs that make lots of these at once can use it too
+
+
+# Draw the stackplot of every year on the axes - values has one row per stack, or if banded is True it's the top edge of each band
+# (from distribution.cumulative_bands) rather than the height of each stack
+def draw_total(ax, years, values, gender, banded=False):
+
+    # Defining the bounds of the plot
+    ax.set_xlim(years[0],years[-1])
+    ax.set_ylim(0,100) # 0-100 percent
+
+    # We'll use this array to generate our colour scheme for each stack - the numbers will be normalised to a colourmap
+    colours = np.linspace(1,10**6, len(values))
+
+    # Shuffle them about so that every single stack has differently coloured neighbours
+    random.shuffle(colours)
+
+    # Pretty and cyclic colour map
+    cmap = plt.get_cmap("hsv")
+    norm = mcolours.Normalize(vmin = colours.min(), vmax = colours.max())
+
+    if banded:
+        # Thousands of bands would be far too slow as separate stacks, so they're all one rasterised collection
+        the_plot = ax.add_collection(band_collection(years, values, cmap(norm(colours))))
+    else:
+        the_plot = ax.stackplot(years,
+                                values,
+                                colors = cmap(norm(colours)))
+
+    ax.set_xlabel("Year" , fontsize=15)
+    ax.set_ylabel("Percentage of total babies born with name", fontsize=15)
+    ax.set_title(f"US {gender} baby names on a stackplot", fontsize=22)
+
+    return the_plot
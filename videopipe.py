@@ -0,0 +1,98 @@
+import os
+import subprocess
+from instrument import frame, step
+
+# Streams frames straight from the matplotlib canvas into ffmpeg to encode as a video, without saving any images in between.
+# Each frame is the canvas's own RGBA buffer, written to ffmpeg's stdin as it is. The pipe only holds a small amount at once, so if
+# ffmpeg falls behind, writing the next frame just waits for it to catch up - nothing piles up in memory however long the video is.
+# The video is written under a temporary name and only renamed once ffmpeg has finished it, so a file with the proper name is always
+# a whole video.
+
+# The ffmpeg arguments for each kind of video file we can make
+# yuv420p needs an even width and height, so the frame gets a row/column of white added to it if it doesn't have one
+encoder_args = {
+    ".mp4" : ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-pix_fmt", "yuv420p",
+              "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white", "-movflags", "+faststart"],
+    ".webm" : ["-c:v", "libvpx-vp9", "-crf", "32", "-b:v", "0", "-row-mt", "1", "-pix_fmt", "yuv420p",
+               "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2:color=white"],
+}
+
+
+class VideoPipe:
+
+    # width and height are the size of the frames in pixels, the kind of video made depends on the extension of filename
+    def __init__(self, filename, width, height, fps, ffmpeg="ffmpeg"):
+        extension = filename[filename.rfind("."):].lower()
+
+        if extension not in encoder_args:
+            raise ValueError(f"Can't stream to a {extension} file, only to: {', '.join(encoder_args)}")
+
+        # The extension stays on the end so ffmpeg still knows what kind of file to make
+        self.filename = filename
+        base, ending = os.path.splitext(filename)
+        self.partial = base + ".part" + ending
+        self.command = [ffmpeg, "-y", "-loglevel", "error",
+                        "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+                        *encoder_args[extension], self.partial]
+        self.process = None
+
+    def __enter__(self):
+        # bufsize=0 so that writes go straight into the pipe instead of being copied into another buffer first
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, bufsize=0)
+        return self
+
+    # Send one frame - buffer is anything that supports the buffer protocol (e.g. canvas.buffer_rgba()) and isn't copied
+    # A pipe write can take only part of the frame, so keep going until all of it has gone
+    def write(self, buffer):
+        view = memoryview(buffer).cast("B")
+
+        while view:
+            written = self.process.stdin.write(view)
+            view = view[written:]
+
+    def close(self):
+        self.process.stdin.close()
+
+        if self.process.wait() != 0:
+            self.remove_partial()
+            raise subprocess.CalledProcessError(self.process.returncode, self.command)
+
+        os.replace(self.partial, self.filename)
+
+    def remove_partial(self):
+        try:
+            os.remove(self.partial)
+        except FileNotFoundError:
+            pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # If something went wrong while drawing then don't leave a half-written video and a stuck ffmpeg behind
+        if exc_type is not None:
+            self.process.kill()
+            self.process.wait()
+            self.remove_partial()
+            return False
+
+        self.close()
+        return False
+
+
+# Draw each of the given frames with the renderer and stream them into a video file
+# draw(i) should update the renderer's artists for frame i (e.g. the animate function)
+def stream_video(renderer, draw, frame_numbers, filename, fps):
+
+    if len(frame_numbers) == 0:
+        raise ValueError("There are no frames to save")
+
+    width, height = renderer.fig.canvas.get_width_height(physical=True)
+
+    with VideoPipe(filename, width, height, fps) as pipe:
+        for i in frame_numbers:
+            with frame(i):
+                draw(i)
+
+                with step("draw"):
+                    buffer = renderer.blit()
+                # This is also where we wait if ffmpeg has fallen behind
+                with step("encode"):
+                    pipe.write(buffer)